@@ -1381,6 +1381,8 @@ export default function TripDetailScreen() {
   const [mentionFilter, setMentionFilter] = useState('');
   const [geminiTyping, setGeminiTyping] = useState(false);
   const [geminiTypingStatus, setGeminiTypingStatus] = useState('');
+  // Reply text streamed in via message_delta while Gemini is still typing
+  const [geminiDraft, setGeminiDraft] = useState('');
   const [usersTyping, setUsersTyping] = useState<Set<string>>(new Set());
   const typingTimeoutRef = useRef<ReturnType<typeof setTimeout> | null>(null);
   const userTypingTimeoutsRef = useRef<Map<string, ReturnType<typeof setTimeout>>>(new Map());
@@ -1844,137 +1846,153 @@ export default function TripDetailScreen() {
 
     ws.onmessage = (event) => {
       try {
-        const data = JSON.parse(event.data as string);
-        if (data.type === 'history' && Array.isArray(data.messages)) {
-          setMessages(
-            data.messages.map((m: { id: string; content: string; is_ai: boolean; user_name: string; user_id?: string; created_at?: string }) => ({
-              id: String(m.id),
-              content: m.content,
-              isAI: m.is_ai,
-              name: m.user_name || 'Unknown',
-              user_id: m.user_id ?? '',
-              timestamp: m.created_at || new Date().toISOString(),
-            }))
-          );
-          if (data.itinerary && Array.isArray(data.itinerary) && id) {
-            const itinerary = normalizeItinerary(data.itinerary);
-            if (itinerary.length > 0) {
-              const dates = itineraryToTripDates(itinerary);
-              updateTrip(id, { itinerary, ...dates });
-            }
-          }
-        } else if (data.type === 'typing' && data.user_name === 'Gemini') {
-          setGeminiTyping(true);
-          setGeminiTypingStatus('');
-        } else if (data.type === 'typing_status' && typeof data.message === 'string') {
-          setGeminiTypingStatus(data.message);
-        } else if (data.type === 'typing' && data.user_name && data.user_id) {
-          // Handle typing from other users (not self, not Gemini)
-          if (data.user_id !== (user?.id ?? '')) {
-            console.log('[Typing] User typing:', data.user_id, data.user_name);
-            
-            // Clear any existing timeout for this user
-            const existingTimeout = userTypingTimeoutsRef.current.get(data.user_id);
-            if (existingTimeout) {
-              clearTimeout(existingTimeout);
+        const frame = JSON.parse(event.data as string);
+        // The backend sends packets from one AI turn as a single array frame
+        for (const data of Array.isArray(frame) ? frame : [frame]) {
+          if (data.type === 'history' && Array.isArray(data.messages)) {
+            setMessages(
+              data.messages.map((m: { id: string; content: string; is_ai: boolean; user_name: string; user_id?: string; created_at?: string }) => ({
+                id: String(m.id),
+                content: m.content,
+                isAI: m.is_ai,
+                name: m.user_name || 'Unknown',
+                user_id: m.user_id ?? '',
+                timestamp: m.created_at || new Date().toISOString(),
+              }))
+            );
+            if (data.itinerary && Array.isArray(data.itinerary) && id) {
+              const itinerary = normalizeItinerary(data.itinerary);
+              if (itinerary.length > 0) {
+                const dates = itineraryToTripDates(itinerary);
+                updateTrip(id, { itinerary, ...dates });
+              }
             }
-            
-            // Show typing indicator
-            setUsersTyping((prev) => {
-              const newSet = new Set(prev);
-              newSet.add(data.user_id);
-              console.log('[Typing] Updated usersTyping:', Array.from(newSet));
-              return newSet;
-            });
-            
-            // Set new timeout to clear typing indicator after 3 seconds of no activity
-            const timeout = setTimeout(() => {
-              console.log('[Typing] Timeout clearing:', data.user_id);
+          } else if (data.type === 'typing' && data.user_name === 'Gemini') {
+            setGeminiTyping(true);
+            setGeminiTypingStatus('');
+            setGeminiDraft('');
+          } else if (data.type === 'typing_status' && typeof data.message === 'string') {
+            setGeminiTypingStatus(data.message);
+          } else if (data.type === 'message_delta' && typeof data.text === 'string') {
+            // replace: a tool round's draft was superseded; start over from this text
+            setGeminiDraft((prev) => (data.replace ? data.text : prev + data.text));
+          } else if (data.type === 'typing' && data.user_name && data.user_id) {
+            // Handle typing from other users (not self, not Gemini)
+            if (data.user_id !== (user?.id ?? '')) {
+              console.log('[Typing] User typing:', data.user_id, data.user_name);
+              
+              // Clear any existing timeout for this user
+              const existingTimeout = userTypingTimeoutsRef.current.get(data.user_id);
+              if (existingTimeout) {
+                clearTimeout(existingTimeout);
+              }
+              
+              // Show typing indicator
               setUsersTyping((prev) => {
-                const next = new Set(prev);
-                next.delete(data.user_id);
-                return next;
+                const newSet = new Set(prev);
+                newSet.add(data.user_id);
+                console.log('[Typing] Updated usersTyping:', Array.from(newSet));
+                return newSet;
               });
-              userTypingTimeoutsRef.current.delete(data.user_id);
-            }, 3000);
-            
-            userTypingTimeoutsRef.current.set(data.user_id, timeout);
-          }
-        } else if (data.type === 'stop_typing' && data.user_id) {
-          // Handle stop_typing event - clear immediately after a short delay
-          if (data.user_id !== (user?.id ?? '')) {
-            console.log('[Typing] Stop typing:', data.user_id);
-            
-            // Clear any existing timeout for this user
-            const existingTimeout = userTypingTimeoutsRef.current.get(data.user_id);
-            if (existingTimeout) {
-              clearTimeout(existingTimeout);
+              
+              // Set new timeout to clear typing indicator after 3 seconds of no activity
+              const timeout = setTimeout(() => {
+                console.log('[Typing] Timeout clearing:', data.user_id);
+                setUsersTyping((prev) => {
+                  const next = new Set(prev);
+                  next.delete(data.user_id);
+                  return next;
+                });
+                userTypingTimeoutsRef.current.delete(data.user_id);
+              }, 3000);
+              
+              userTypingTimeoutsRef.current.set(data.user_id, timeout);
+            }
+          } else if (data.type === 'stop_typing' && data.user_id) {
+            // Handle stop_typing event - clear immediately after a short delay
+            if (data.user_id !== (user?.id ?? '')) {
+              console.log('[Typing] Stop typing:', data.user_id);
+              
+              // Clear any existing timeout for this user
+              const existingTimeout = userTypingTimeoutsRef.current.get(data.user_id);
+              if (existingTimeout) {
+                clearTimeout(existingTimeout);
+              }
+              
+              // Set shorter timeout to clear typing indicator after stop_typing
+              const timeout = setTimeout(() => {
+                console.log('[Typing] Stop typing timeout clearing:', data.user_id);
+                setUsersTyping((prev) => {
+                  const next = new Set(prev);
+                  next.delete(data.user_id);
+                  return next;
+                });
+                userTypingTimeoutsRef.current.delete(data.user_id);
+              }, 500);
+              
+              userTypingTimeoutsRef.current.set(data.user_id, timeout);
+            }
+          } else if (data.type === 'message' && data.message) {
+            const m = data.message;
+            if (m.user_name === 'Gemini') {
+              setGeminiTyping(false);
+              setGeminiTypingStatus('');
+              setGeminiDraft('');
             }
-            
-            // Set shorter timeout to clear typing indicator after stop_typing
-            const timeout = setTimeout(() => {
-              console.log('[Typing] Stop typing timeout clearing:', data.user_id);
+            // Clear typing indicator for this user
+            if (m.user_id) {
+              // Clear any pending timeout
+              const existingTimeout = userTypingTimeoutsRef.current.get(m.user_id);
+              if (existingTimeout) {
+                clearTimeout(existingTimeout);
+                userTypingTimeoutsRef.current.delete(m.user_id);
+              }
+              
               setUsersTyping((prev) => {
                 const next = new Set(prev);
-                next.delete(data.user_id);
+                next.delete(m.user_id);
                 return next;
               });
-              userTypingTimeoutsRef.current.delete(data.user_id);
-            }, 500);
-            
-            userTypingTimeoutsRef.current.set(data.user_id, timeout);
-          }
-        } else if (data.type === 'message' && data.message) {
-          const m = data.message;
-          if (m.user_name === 'Gemini') {
+            }
+            // A message saved just before we joined is in history and may also arrive here
+            setMessages((prev) => prev.some((x) => x.id === String(m.id)) ? prev : [
+              ...prev,
+              {
+                id: String(m.id),
+                content: m.content,
+                isAI: m.is_ai,
+                name: m.user_name || 'Unknown',
+                user_id: m.user_id ?? '',
+                timestamp: m.created_at || new Date().toISOString(),
+                ...(Array.isArray(m.suggestions) && m.suggestions.length > 0 ? { suggestions: m.suggestions } : {}),
+              },
+            ]);
+            setTimeout(() => messagesScrollRef.current?.scrollToEnd({ animated: true }), 100);
+          } else if (data.type === 'itinerary' && data.itinerary && Array.isArray(data.itinerary) && id) {
             setGeminiTyping(false);
             setGeminiTypingStatus('');
-          }
-          // Clear typing indicator for this user
-          if (m.user_id) {
-            // Clear any pending timeout
-            const existingTimeout = userTypingTimeoutsRef.current.get(m.user_id);
-            if (existingTimeout) {
-              clearTimeout(existingTimeout);
-              userTypingTimeoutsRef.current.delete(m.user_id);
+            const itinerary = normalizeItinerary(data.itinerary);
+            if (itinerary.length > 0) {
+              const dates = itineraryToTripDates(itinerary);
+              updateTrip(id, {
+                itinerary,
+                ...dates,
+                ...(typeof data.destination === 'string' && { destination: data.destination }),
+              });
+              setActiveTab('Plan');
+            }
+          } else if (data.type === 'trip_update' && id && typeof data.destination === 'string') {
+            setGeminiTyping(false);
+            setGeminiTypingStatus('');
+            updateTrip(id, { destination: data.destination });
+          } else if (data.type === 'trip_cover_updated' && id) {
+            if (typeof data.photoUri === 'string') {
+              setTripCoverImage({ uri: data.photoUri, attributions: data.attributions ?? [] });
+            }
+            if (typeof data.destination === 'string') {
+              updateTrip(id, { destination: data.destination });
             }
-            
-            setUsersTyping((prev) => {
-              const next = new Set(prev);
-              next.delete(m.user_id);
-              return next;
-            });
-          }
-          setMessages((prev) => [
-            ...prev,
-            {
-              id: String(m.id),
-              content: m.content,
-              isAI: m.is_ai,
-              name: m.user_name || 'Unknown',
-              user_id: m.user_id ?? '',
-              timestamp: m.created_at || new Date().toISOString(),
-              ...(Array.isArray(m.suggestions) && m.suggestions.length > 0 ? { suggestions: m.suggestions } : {}),
-            },
-          ]);
-          setTimeout(() => messagesScrollRef.current?.scrollToEnd({ animated: true }), 100);
-        } else if (data.type === 'itinerary' && data.itinerary && Array.isArray(data.itinerary) && id) {
-          setGeminiTyping(false);
-          setGeminiTypingStatus('');
-          const itinerary = normalizeItinerary(data.itinerary);
-          if (itinerary.length > 0) {
-            const dates = itineraryToTripDates(itinerary);
-            updateTrip(id, {
-              itinerary,
-              ...dates,
-              ...(typeof data.destination === 'string' && { destination: data.destination }),
-            });
-            setActiveTab('Plan');
           }
-        } else if (data.type === 'trip_update' && id && typeof data.destination === 'string') {
-          setGeminiTyping(false);
-          setGeminiTypingStatus('');
-          updateTrip(id, { destination: data.destination });
         }
       } catch (_) {}
     };
@@ -2557,14 +2575,22 @@ export default function TripDetailScreen() {
                               styles.bubbleAI,
                               styles.typingBubble,
                             ]}>
-                            <View style={styles.typingDotsRow}>
-                              {[0, 1, 2].map((i) => (
-                                <RNAnimated.View
-                                  key={i}
-                                  style={[styles.typingDot, { opacity: dotAnims[i] }]}
-                                />
-                              ))}
-                            </View>
+                            {geminiDraft ? (
+                              <MarkdownText
+                                baseStyle={StyleSheet.flatten([styles.messageText, styles.messageTextAI])}
+                                codeStyle={{ backgroundColor: 'rgba(0,0,0,0.1)' }}>
+                                {geminiDraft.trimStart()}
+                              </MarkdownText>
+                            ) : (
+                              <View style={styles.typingDotsRow}>
+                                {[0, 1, 2].map((i) => (
+                                  <RNAnimated.View
+                                    key={i}
+                                    style={[styles.typingDot, { opacity: dotAnims[i] }]}
+                                  />
+                                ))}
+                              </View>
+                            )}
                             {geminiTypingStatus ? (
                               <Text style={styles.typingStatusText}>{geminiTypingStatus}</Text>
                             ) : null}
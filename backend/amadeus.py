@@ -17,6 +17,17 @@ TOKEN_URL = f"{BASE_URL}/v1/security/oauth2/token"
 _token_cache: dict[str, tuple[str, float]] = {}
 TOKEN_EXPIRY_BUFFER = 60  # refresh 60s before expiry
 
+# One pooled session for token, location, flight and hotel calls (keep-alive across searches)
+_session = requests.Session()
+_session.mount(
+    "https://", requests.adapters.HTTPAdapter(pool_connections=4, pool_maxsize=20)
+)
+
+
+def close_session() -> None:
+    """Close pooled connections (called on app shutdown)."""
+    _session.close()
+
 
 def _get_credentials() -> tuple[str, str] | None:
     api_key = (
@@ -44,7 +55,7 @@ def _get_access_token() -> str | None:
         if expires_at > now + TOKEN_EXPIRY_BUFFER:
             return token
     try:
-        r = requests.post(
+        r = _session.post(
             TOKEN_URL,
             headers={"Content-Type": "application/x-www-form-urlencoded"},
             data={
@@ -77,7 +88,7 @@ def _resolve_city_to_iata(city_or_code: str) -> str | None:
     if not token:
         return None
     try:
-        r = requests.get(
+        r = _session.get(
             f"{BASE_URL}/v1/reference-data/locations",
             params={
                 "keyword": city_or_code,
@@ -127,7 +138,7 @@ def search_flights(
         }
         if return_date:
             params["returnDate"] = return_date
-        r = requests.get(
+        r = _session.get(
             f"{BASE_URL}/v2/shopping/flight-offers",
             params=params,
             headers={"Authorization": f"Bearer {token}"},
@@ -168,7 +179,7 @@ def search_flights(
 def _get_hotel_ids_by_city(city_code: str, token: str, limit: int = 20) -> list[str]:
     """Get Amadeus hotel IDs for a city via Hotel List API (required for v3 hotel-offers)."""
     try:
-        r = requests.get(
+        r = _session.get(
             f"{BASE_URL}/v1/reference-data/locations/hotels/by-city",
             params={"cityCode": city_code},
             headers={"Authorization": f"Bearer {token}"},
@@ -209,7 +220,7 @@ def search_hotels(
         return {"hotels": [], "city": city_code, "error": "No hotels found for this city"}
     try:
         # v3 requires hotelIds and adults; cityCode/lat/long removed
-        r = requests.get(
+        r = _session.get(
             f"{BASE_URL}/v3/shopping/hotel-offers",
             params={
                 "hotelIds": ",".join(hotel_ids[:20]),
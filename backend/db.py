@@ -1,14 +1,19 @@
 """SQLite persistence for trips, members, chat, join codes, users, trip images, and expenses."""
 
-import json
+import logging
 import os
 import random
 import sqlite3
+import threading
 import uuid
 from contextlib import contextmanager
 from datetime import datetime
 from typing import Any, Iterator, Optional
 
+import orjson
+
+logger = logging.getLogger(__name__)
+
 
 def _parse_created_at(created_at: Optional[str]) -> int:
     """Convert SQLite datetime or ISO string to ms since epoch. Returns 0 if invalid."""
@@ -34,9 +39,13 @@ DB_PATH = os.environ.get(
 
 @contextmanager
 def get_db() -> Iterator[sqlite3.Connection]:
-    conn = sqlite3.connect(DB_PATH)
+    conn = sqlite3.connect(DB_PATH, timeout=5.0)
     conn.row_factory = sqlite3.Row
     conn.execute("PRAGMA foreign_keys = ON")
+    # Per-connection settings; WAL itself is persisted in the file by init_db. NORMAL is
+    # durable across app crashes in WAL mode and skips an fsync per commit.
+    conn.execute("PRAGMA synchronous = NORMAL")
+    conn.execute("PRAGMA temp_store = MEMORY")
     try:
         yield conn
         conn.commit()
@@ -64,6 +73,8 @@ def _migrate_trips_columns(conn: sqlite3.Connection) -> None:
 
 def init_db() -> None:
     with get_db() as conn:
+        # WAL lets readers (history, itinerary) run while a write is in progress
+        conn.execute("PRAGMA journal_mode = WAL")
         # --- Core: trips (id + details; details added by migration for existing DBs) ---
         conn.execute("""
             CREATE TABLE IF NOT EXISTS trips (
@@ -135,9 +146,32 @@ def init_db() -> None:
                 created_at TEXT NOT NULL DEFAULT (datetime('now'))
             )
         """)
-        conn.execute(
-            "CREATE INDEX IF NOT EXISTS idx_trip_codes_trip_id ON trip_codes(trip_id)"
-        )
+        # Extra codes a trip had before codes became one per trip; they still resolve
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS trip_code_aliases (
+                code TEXT PRIMARY KEY,
+                trip_id TEXT NOT NULL
+            )
+        """)
+        # One code per trip, enforced so register_code can upsert on trip_id. Covers the
+        # trip_id lookups the old non-unique index served.
+        has_unique = conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'index' AND name = 'idx_trip_codes_trip_unique'"
+        ).fetchone()
+        if not has_unique:
+            # Keep the oldest code per trip; move the rest to aliases so shared codes keep working
+            extra = "rowid NOT IN (SELECT MIN(rowid) FROM trip_codes GROUP BY trip_id)"
+            conn.execute(
+                f"INSERT OR IGNORE INTO trip_code_aliases (code, trip_id) "
+                f"SELECT code, trip_id FROM trip_codes WHERE {extra}"
+            )
+            moved = conn.execute(f"DELETE FROM trip_codes WHERE {extra}").rowcount
+            if moved:
+                logger.info("Moved %d duplicate trip code(s) to trip_code_aliases", moved)
+            conn.execute(
+                "CREATE UNIQUE INDEX idx_trip_codes_trip_unique ON trip_codes(trip_id)"
+            )
+        conn.execute("DROP INDEX IF EXISTS idx_trip_codes_trip_id")
         conn.execute("""
             CREATE TABLE IF NOT EXISTS trip_memberships (
                 trip_id TEXT NOT NULL,
@@ -273,24 +307,14 @@ def register_code(trip_id: str) -> str:
     """Get or create a 4-digit code for this trip. Returns the code."""
     with get_db() as conn:
         _ensure_trip(conn, trip_id)
-        row = conn.execute(
-            "SELECT code FROM trip_codes WHERE trip_id = ?", (trip_id,)
-        ).fetchone()
-        if row:
-            return row["code"]
-        code = _random_4_digit()
-        while True:
-            existing = conn.execute(
-                "SELECT 1 FROM trip_codes WHERE code = ?", (code,)
-            ).fetchone()
-            if not existing:
-                break
-            code = _random_4_digit()
-        conn.execute(
-            "INSERT INTO trip_codes (code, trip_id) VALUES (?, ?)",
-            (code, trip_id),
-        )
-    return code
+        return _register_code_conn(conn, trip_id)
+
+
+# A code never moves to another trip once issued, so hits can be kept without expiry.
+# Misses are not cached: a code may be registered right after someone mistypes it.
+_CODE_CACHE_MAX = 4096
+_code_cache: dict[str, str] = {}
+_code_cache_lock = threading.Lock()
 
 
 def resolve_code(code: str) -> Optional[str]:
@@ -298,11 +322,23 @@ def resolve_code(code: str) -> Optional[str]:
     normalized = (code or "").strip()
     if len(normalized) != 4 or not normalized.isdigit():
         return None
+    with _code_cache_lock:
+        trip_id = _code_cache.get(normalized)
+    if trip_id is not None:
+        return trip_id
     with get_db() as conn:
         row = conn.execute(
             "SELECT trip_id FROM trip_codes WHERE code = ?", (normalized,)
+        ).fetchone() or conn.execute(
+            "SELECT trip_id FROM trip_code_aliases WHERE code = ?", (normalized,)
         ).fetchone()
-    return row["trip_id"] if row else None
+    if not row:
+        return None
+    with _code_cache_lock:
+        if len(_code_cache) >= _CODE_CACHE_MAX:
+            del _code_cache[next(iter(_code_cache))]
+        _code_cache[normalized] = row["trip_id"]
+    return row["trip_id"]
 
 
 def add_trip_member(conn: sqlite3.Connection, trip_id: str, user_id: str) -> None:
@@ -338,7 +374,7 @@ def get_trip(trip_id: str) -> Optional[dict[str, Any]]:
         raw_attr = r.get("cover_photo_attributions")
         if raw_attr:
             try:
-                out["coverPhotoAttributions"] = json.loads(raw_attr)
+                out["coverPhotoAttributions"] = orjson.loads(raw_attr)
             except (TypeError, ValueError):
                 out["coverPhotoAttributions"] = []
         else:
@@ -397,24 +433,30 @@ def set_trip_cover(
         conn.execute(
             """UPDATE trips SET cover_place_id = ?, cover_photo_name = ?, cover_photo_attributions = ?
                WHERE id = ?""",
-            (place_id or None, (photo_name or "").strip() or None, json.dumps(attributions or []), trip_id),
+            (place_id or None, (photo_name or "").strip() or None, orjson.dumps(attributions or []).decode(), trip_id),
         )
 
 
 def _register_code_conn(conn: sqlite3.Connection, trip_id: str) -> str:
-    """Get or create 4-digit code for trip (caller holds conn)."""
-    row = conn.execute(
-        "SELECT code FROM trip_codes WHERE trip_id = ?", (trip_id,)
-    ).fetchone()
-    if row:
-        return row["code"]
-    code = _random_4_digit()
-    while conn.execute("SELECT 1 FROM trip_codes WHERE code = ?", (code,)).fetchone():
+    """Get or create 4-digit code for trip (caller holds conn). One upsert: returns the
+    existing code if the trip has one; retries only if the random code is taken by another trip."""
+    while True:
         code = _random_4_digit()
-    conn.execute(
-        "INSERT INTO trip_codes (code, trip_id) VALUES (?, ?)", (code, trip_id)
-    )
-    return code
+        # A legacy alias still resolves, so a new code must not reuse it
+        if conn.execute(
+            "SELECT 1 FROM trip_code_aliases WHERE code = ?", (code,)
+        ).fetchone():
+            continue
+        try:
+            row = conn.execute(
+                """INSERT INTO trip_codes (code, trip_id) VALUES (?, ?)
+                   ON CONFLICT(trip_id) DO UPDATE SET trip_id = trip_id
+                   RETURNING code""",
+                (code, trip_id),
+            ).fetchone()
+            return row["code"]
+        except sqlite3.IntegrityError:
+            continue
 
 
 def get_trip_members(trip_id: str) -> list[dict[str, Any]]:
@@ -472,7 +514,7 @@ def get_trips_for_user(user_id: str) -> list[dict[str, Any]]:
             raw_attr = r.get("cover_photo_attributions")
             if raw_attr:
                 try:
-                    out["coverPhotoAttributions"] = json.loads(raw_attr)
+                    out["coverPhotoAttributions"] = orjson.loads(raw_attr)
                 except (TypeError, ValueError):
                     out["coverPhotoAttributions"] = []
             else:
@@ -549,6 +591,18 @@ def set_itinerary(trip_id: str, itinerary_json: str) -> None:
         )
 
 
+def _message_row(r: sqlite3.Row) -> dict:
+    return {
+        "id": str(r["id"]),
+        "trip_id": r["trip_id"],
+        "user_id": r["user_id"] or None,
+        "user_name": r["user_name"],
+        "content": r["content"],
+        "is_ai": bool(r["is_ai"]),
+        "created_at": r["created_at"],
+    }
+
+
 def get_messages(trip_id: str, limit: int = 200) -> list[dict]:
     with get_db() as conn:
         rows = conn.execute(
@@ -561,44 +615,57 @@ def get_messages(trip_id: str, limit: int = 200) -> list[dict]:
             """,
             (trip_id, limit),
         ).fetchall()
-    return [
-        {
-            "id": str(r["id"]),
-            "trip_id": r["trip_id"],
-            "user_id": r["user_id"] or None,
-            "user_name": r["user_name"],
-            "content": r["content"],
-            "is_ai": bool(r["is_ai"]),
-            "created_at": r["created_at"],
-        }
-        for r in rows
-    ]
+    return [_message_row(r) for r in rows]
 
 
-def add_trip_media(trip_id: str, uri: str, media_type: str) -> dict:
-    """Add one media item for a trip. type is 'image' or 'video'."""
+def get_recent_messages(trip_id: str, limit: int) -> list[dict]:
+    """The latest `limit` messages for a trip, oldest first."""
     with get_db() as conn:
-        cur = conn.execute(
+        rows = conn.execute(
             """
-            INSERT INTO trip_media (trip_id, uri, type)
-            VALUES (?, ?, ?)
+            SELECT id, trip_id, user_id, user_name, content, is_ai, created_at
+            FROM messages
+            WHERE trip_id = ?
+            ORDER BY created_at DESC, id DESC
+            LIMIT ?
             """,
-            (trip_id, uri, media_type),
-        )
-        row_id = cur.lastrowid
-        row = conn.execute(
-            "SELECT id, trip_id, uri, type, created_at FROM trip_media WHERE id = ?",
-            (row_id,),
-        ).fetchone()
+            (trip_id, limit),
+        ).fetchall()
+    return [_message_row(r) for r in reversed(rows)]
+
+
+def _media_row(r: sqlite3.Row) -> dict:
     return {
-        "id": str(row["id"]),
-        "trip_id": row["trip_id"],
-        "uri": row["uri"],
-        "type": row["type"],
-        "created_at": row["created_at"],
+        "id": str(r["id"]),
+        "trip_id": r["trip_id"],
+        "uri": r["uri"],
+        "type": r["type"],
+        "created_at": r["created_at"],
     }
 
 
+def add_trip_media(trip_id: str, uri: str, media_type: str) -> dict:
+    """Add one media item for a trip. type is 'image' or 'video'."""
+    return add_trip_media_bulk(trip_id, [(uri, media_type)])[0]
+
+
+def add_trip_media_bulk(trip_id: str, items: list[tuple[str, str]]) -> list[dict]:
+    """Add (uri, type) media items for a trip in one transaction. Returns the records in order."""
+    with get_db() as conn:
+        rows = [
+            conn.execute(
+                """
+                INSERT INTO trip_media (trip_id, uri, type)
+                VALUES (?, ?, ?)
+                RETURNING id, trip_id, uri, type, created_at
+                """,
+                (trip_id, uri, media_type),
+            ).fetchone()
+            for uri, media_type in items
+        ]
+    return [_media_row(r) for r in rows]
+
+
 def get_trip_media(trip_id: str) -> list[dict]:
     """Return all media for a trip, oldest first."""
     with get_db() as conn:
@@ -611,16 +678,7 @@ def get_trip_media(trip_id: str) -> list[dict]:
             """,
             (trip_id,),
         ).fetchall()
-    return [
-        {
-            "id": str(r["id"]),
-            "trip_id": r["trip_id"],
-            "uri": r["uri"],
-            "type": r["type"],
-            "created_at": r["created_at"],
-        }
-        for r in rows
-    ]
+    return [_media_row(r) for r in rows]
 
 
 # --- Users ---
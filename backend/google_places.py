@@ -20,6 +20,17 @@ BASE_DISTANCE = "https://maps.googleapis.com/maps/api/distancematrix/json"
 BASE_DIRECTIONS = "https://maps.googleapis.com/maps/api/directions/json"
 BASE_GEOCODE = "https://maps.googleapis.com/maps/api/geocode/json"
 
+# One pooled session for all Google calls so repeated tool calls reuse TCP/TLS connections
+_session = requests.Session()
+_session.mount(
+    "https://", requests.adapters.HTTPAdapter(pool_connections=10, pool_maxsize=50)
+)
+
+
+def close_session() -> None:
+    """Close pooled connections (called on app shutdown)."""
+    _session.close()
+
 
 def _get_api_key() -> str | None:
     return os.environ.get("EXPO_PUBLIC_GOOGLE_MAPS_API_KEY") or os.environ.get(
@@ -68,7 +79,7 @@ def search_places(
             "X-Goog-Api-Key": key,
             "X-Goog-FieldMask": "places.id,places.displayName,places.formattedAddress,places.rating,places.userRatingCount",
         }
-        r = requests.post(BASE_PLACES_NEW, json=body, headers=headers, timeout=10)
+        r = _session.post(BASE_PLACES_NEW, json=body, headers=headers, timeout=10)
         if r.status_code == 403:
             logger.warning(
                 "Places API (New) returned 403. Enable 'Places API (New)' in Google Cloud Console "
@@ -125,7 +136,7 @@ def get_place_details(place_id: str) -> dict[str, Any]:
             "key": key,
         }
         url = f"{BASE_PLACES_LEGACY}/details/json"
-        r = requests.get(url, params=params, timeout=10)
+        r = _session.get(url, params=params, timeout=10)
         r.raise_for_status()
         data = r.json()
         if data.get("status") != "OK":
@@ -181,7 +192,7 @@ def get_distance_matrix(
             "mode": mode,
             "key": key,
         }
-        r = requests.get(BASE_DISTANCE, params=params, timeout=15)
+        r = _session.get(BASE_DISTANCE, params=params, timeout=15)
         r.raise_for_status()
         data = r.json()
         if data.get("status") != "OK":
@@ -255,7 +266,7 @@ def get_directions(
             params["waypoints"] = "|".join(
                 quote_plus(w.strip()) for w in waypoints if (w or "").strip()
             )
-        r = requests.get(BASE_DIRECTIONS, params=params, timeout=15)
+        r = _session.get(BASE_DIRECTIONS, params=params, timeout=15)
         r.raise_for_status()
         data = r.json()
         status = data.get("status")
@@ -318,7 +329,7 @@ def geocode_address(address: str) -> dict[str, Any]:
         return {"error": "address is required"}
     try:
         params = {"address": address, "key": key}
-        r = requests.get(BASE_GEOCODE, params=params, timeout=10)
+        r = _session.get(BASE_GEOCODE, params=params, timeout=10)
         r.raise_for_status()
         data = r.json()
         if data.get("status") != "OK":
@@ -385,7 +396,7 @@ def get_place_with_photos(place_id: str) -> dict[str, Any]:
             "X-Goog-Api-Key": key,
             "X-Goog-FieldMask": "id,displayName,photos",
         }
-        r = requests.get(url, headers=headers, timeout=10)
+        r = _session.get(url, headers=headers, timeout=10)
         r.raise_for_status()
         data = r.json()
         return data
@@ -416,7 +427,7 @@ def get_photo_media(photo_name: str, max_width_px: int = 800) -> dict[str, Any]:
         url = f"{PLACES_NEW_BASE}/{media_name}"
         params = {"maxWidthPx": max_width_px, "skipHttpRedirect": "true", "key": key}
         headers = {"X-Goog-Api-Key": key}
-        r = requests.get(url, params=params, headers=headers, timeout=10)
+        r = _session.get(url, params=params, headers=headers, timeout=10)
         r.raise_for_status()
         data = r.json()
         photo_uri = data.get("photoUri")
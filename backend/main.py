@@ -7,21 +7,34 @@ Custom Python backend for Going Places chat.
 """
 
 import asyncio
-import json
+import base64
+import bisect
+import functools
+import hashlib
+import itertools
 import logging
 import os
-import queue
 import re
+import shutil
+import threading
+import time
 import uuid
+from concurrent.futures import CancelledError, Future, ThreadPoolExecutor
+from dataclasses import dataclass, field
 from datetime import datetime
 from pathlib import Path
-from typing import Any
+from types import SimpleNamespace
+from typing import Any, Callable, Iterable
 
+import httpx
+import orjson
 from dotenv import load_dotenv
 from fastapi import (
     BackgroundTasks,
     FastAPI,
     HTTPException,
+    Request,
+    Response,
     WebSocket,
     WebSocketDisconnect,
     Query,
@@ -31,12 +44,15 @@ from fastapi import (
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import FileResponse
 from fastapi.staticfiles import StaticFiles
+from fastapi.websockets import WebSocketState
+from openai import OpenAI
 from pydantic import BaseModel
 
 from db import (
     init_db,
     add_message,
     get_messages,
+    get_recent_messages,
     get_itinerary,
     set_itinerary,
     register_code,
@@ -45,7 +61,7 @@ from db import (
     join_trip_by_code,
     get_trips_for_user,
     get_trip as db_get_trip,
-    add_trip_media,
+    add_trip_media_bulk,
     get_trip_media,
     create_user as db_create_user,
     update_trip_destination,
@@ -65,10 +81,13 @@ from google_places import (
     get_photo_media as gp_get_photo_media,
     get_distance_matrix as gp_get_distance_matrix,
     get_directions as gp_get_directions,
+    geocode_address as gp_geocode_address,
+    close_session as gp_close_session,
 )
 from amadeus import (
     search_flights as amadeus_search_flights,
     search_hotels as amadeus_search_hotels,
+    close_session as amadeus_close_session,
 )
 
 # Load .env.local from project root so EXPO_PUBLIC_OPENROUTER_API_KEY is available
@@ -86,10 +105,13 @@ OPENROUTER_API_KEY = os.environ.get("OPENROUTER_API_KEY") or os.environ.get(
 GOOGLE_MAPS_API_KEY = os.environ.get(
     "EXPO_PUBLIC_GOOGLE_MAPS_API_KEY"
 ) or os.environ.get("GOOGLE_MAPS_API_KEY")
+# Optional: when set, room broadcasts go through Redis Pub/Sub so multiple workers share rooms
+REDIS_URL = os.environ.get("REDIS_URL")
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Endpoints are serialized from their return annotations; the ETag endpoints encode with orjson
 app = FastAPI(title="Going Places Chat API")
 app.add_middleware(
     CORSMiddleware,
@@ -107,46 +129,198 @@ UPLOADS_DIR.mkdir(exist_ok=True)
 RECEIPTS_DIR = Path(__file__).parent / "receipts"
 RECEIPTS_DIR.mkdir(exist_ok=True)
 
-# trip_id -> set of active WebSocket connections
-rooms: dict[str, set[WebSocket]] = {}
+# Connection ids are prefixed per process so an `exclude` id published over Redis never matches another worker's socket
+_WORKER_ID = uuid.uuid4().hex[:8]
+_conn_ids = itertools.count(1)
+# New itinerary activity ids: per-process random prefix + counter (unique across restarts/workers)
+_act_ids = itertools.count(1)
 
 
-def get_room(trip_id: str) -> set[WebSocket]:
-    if trip_id not in rooms:
-        rooms[trip_id] = set()
-    return rooms[trip_id]
+# A socket that can't take a frame within this long is treated as dead so it can't stall the room
+_SEND_TIMEOUT_SECONDS = 5.0
+# Frames a slow client may have waiting before it is disconnected
+_SEND_QUEUE_MAX = 64
 
 
-async def _drain_status_queue(
-    status_queue: queue.Queue[str], room: set[WebSocket]
-) -> None:
-    """Drain status messages from queue and broadcast typing_status to the room until cancelled."""
-    loop = asyncio.get_event_loop()
-    while True:
+@dataclass
+class _Conn:
+    """One socket in a room with its outbound queue. A writer task drains the queue, so a slow
+    client only backs up its own frames; None in the queue tells the writer to close the socket."""
+
+    ws: WebSocket
+    queue: asyncio.Queue[str | None] = field(
+        default_factory=lambda: asyncio.Queue(_SEND_QUEUE_MAX)
+    )
+    writer: asyncio.Task | None = None
+
+    def push(self, data: str) -> bool:
+        """Queue a frame. On overflow, discard the backlog, queue a close and return False."""
         try:
-            msg = await loop.run_in_executor(
-                None, lambda: status_queue.get(timeout=0.25)
+            self.queue.put_nowait(data)
+            return True
+        except asyncio.QueueFull:
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            self.queue.put_nowait(None)
+            return False
+
+    async def write_loop(self) -> None:
+        while True:
+            data = await self.queue.get()
+            if data is None:
+                await self.ws.close(code=1013)
+                return
+            await asyncio.wait_for(self.ws.send_text(data), _SEND_TIMEOUT_SECONDS)
+
+
+@dataclass
+class Rooms:
+    """Active WebSocket connections per trip_id, keyed by connection id.
+    Broadcasts snapshot the room and enqueue the frame on every connection's send queue. No
+    method awaits while it touches `conns`, so the event loop alone keeps it consistent."""
+
+    conns: dict[str, dict[str, _Conn]] = field(default_factory=dict)
+
+    def count(self, trip_id: str) -> int:
+        return len(self.conns.get(trip_id) or ())
+
+    def connect(self, trip_id: str, websocket: WebSocket) -> str:
+        """Register an accepted socket in the trip's room and start its writer. Returns its connection id."""
+        conn_id = f"{_WORKER_ID}-{next(_conn_ids)}"
+        conn = _Conn(websocket)
+        conn.writer = asyncio.create_task(self._run_writer(trip_id, conn_id, conn))
+        self.conns.setdefault(trip_id, {})[conn_id] = conn
+        return conn_id
+
+    def disconnect(self, trip_id: str, conn_id: str) -> None:
+        self._drop(trip_id, (conn_id,))
+
+    def _drop(self, trip_id: str, conn_ids: Iterable[str]) -> None:
+        """Remove connections from a room and stop their writers, deleting the room once it is empty."""
+        room = self.conns.get(trip_id)
+        if room is None:
+            return
+        for cid in conn_ids:
+            conn = room.pop(cid, None)
+            if conn and conn.writer and conn.writer is not asyncio.current_task():
+                conn.writer.cancel()
+        if not room:
+            self.conns.pop(trip_id, None)
+
+    async def _run_writer(self, trip_id: str, conn_id: str, conn: _Conn) -> None:
+        """Drain one connection's queue; a failed or timed-out send closes the socket and drops it
+        from the room, so the client sees the disconnect and reconnects."""
+        try:
+            await conn.write_loop()
+        except Exception as e:
+            logger.info("Dropping socket from trip_id=%s after failed send: %r", trip_id, e)
+            try:
+                await conn.ws.close(code=1011)
+            except Exception:
+                pass
+        self._drop(trip_id, (conn_id,))
+
+    def send_to(self, trip_id: str, conn_id: str, payload: dict[str, Any] | str) -> bool:
+        """Queue a frame for one connection. Returns False if it is gone or its queue overflowed."""
+        conn = (self.conns.get(trip_id) or {}).get(conn_id)
+        return conn is not None and conn.push(_encode(payload))
+
+    def broadcast(
+        self,
+        trip_id: str,
+        payload: dict[str, Any] | list[dict[str, Any]] | str,
+        exclude: str | None = None,
+    ) -> None:
+        """Queue payload for every connection in the room (except `exclude`). Never waits on a client."""
+        # Sockets already closing are skipped; their handler's disconnect removes them
+        targets = [
+            conn
+            for cid, conn in (self.conns.get(trip_id) or {}).items()
+            if cid != exclude
+            and conn.ws.client_state is WebSocketState.CONNECTED
+            and conn.ws.application_state is WebSocketState.CONNECTED
+        ]
+        if not targets:
+            return
+        data = _encode(payload)
+        overflowed = sum(not conn.push(data) for conn in targets)
+        if overflowed:
+            logger.info(
+                "Closing %d socket(s) in trip_id=%s: send queue full", overflowed, trip_id
             )
-            for ws in room:
-                try:
-                    await ws.send_json({"type": "typing_status", "message": msg})
-                except Exception:
-                    pass
-        except queue.Empty:
-            continue
-        except asyncio.CancelledError:
-            break
-    # Final drain
+
+
+def _encode(payload: dict[str, Any] | list[dict[str, Any]] | str) -> str:
+    """Serialize a payload (or a list of payloads sent as one array frame) for a text frame;
+    strings are assumed to be JSON already."""
+    return payload if isinstance(payload, str) else orjson.dumps(payload).decode()
+
+
+rooms = Rooms()
+
+# Redis client for cross-worker fan-out (None when REDIS_URL is unset: broadcast in-process only)
+_redis: Any = None
+_redis_listener: asyncio.Task | None = None
+
+
+async def publish(
+    trip_id: str,
+    payload: dict[str, Any] | list[dict[str, Any]] | str,
+    exclude: str | None = None,
+) -> None:
+    """Broadcast to a trip's room on every worker. Publishes to the trip:{id} Redis channel when
+    configured (each worker's listener then broadcasts locally); otherwise broadcasts in-process."""
+    if _redis is None:
+        rooms.broadcast(trip_id, payload, exclude=exclude)
+        return
+    data = _encode(payload)
+    try:
+        await _redis.publish(
+            f"trip:{trip_id}", orjson.dumps({"exclude": exclude, "data": data})
+        )
+    except Exception as e:
+        logger.warning("Redis publish failed, broadcasting locally: %s", e)
+        rooms.broadcast(trip_id, data, exclude=exclude)
+
+
+async def _listen_redis(client: Any) -> None:
+    """Relay trip:* Pub/Sub messages to the sockets connected to this worker."""
     while True:
+        pubsub = client.pubsub()
         try:
-            msg = status_queue.get_nowait()
-            for ws in room:
-                try:
-                    await ws.send_json({"type": "typing_status", "message": msg})
-                except Exception:
-                    pass
-        except queue.Empty:
-            break
+            await pubsub.psubscribe("trip:*")
+            async for message in pubsub.listen():
+                if message.get("type") != "pmessage":
+                    continue
+                channel = message["channel"]
+                if isinstance(channel, bytes):
+                    channel = channel.decode()
+                trip_id = channel.split(":", 1)[1]
+                if not rooms.count(trip_id):
+                    continue
+                envelope = orjson.loads(message["data"])
+                rooms.broadcast(
+                    trip_id, envelope["data"], exclude=envelope.get("exclude")
+                )
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.warning("Redis listener error, resubscribing: %s", e)
+            await asyncio.sleep(1.0)
+        finally:
+            try:
+                await getattr(pubsub, "aclose", pubsub.close)()
+            except Exception:
+                pass
+
+
+async def _drain_status_queue(
+    status_queue: asyncio.Queue[dict[str, Any] | None], trip_id: str
+) -> None:
+    """Broadcast each queued typing_status / message_delta payload until the None end marker.
+    The worker thread feeds the queue through loop.call_soon_threadsafe, so no thread blocks here."""
+    while (payload := await status_queue.get()) is not None:
+        await publish(trip_id, payload)
 
 
 @app.on_event("startup")
@@ -176,6 +350,49 @@ def startup() -> None:
         )
 
 
+@app.on_event("shutdown")
+def close_http_sessions() -> None:
+    _TOOL_POOL.shutdown(wait=False, cancel_futures=True)
+    _PREFETCH_POOL.shutdown(wait=False, cancel_futures=True)
+    if _openrouter_client.cache_info().currsize:
+        _openrouter_client().close()
+    gp_close_session()
+    amadeus_close_session()
+
+
+@app.on_event("startup")
+async def start_redis_bus() -> None:
+    global _redis, _redis_listener
+    if not REDIS_URL:
+        return
+    try:
+        import redis.asyncio as aioredis
+    except ImportError:
+        logger.warning(
+            "REDIS_URL is set but the redis package is not installed; broadcasting in-process only"
+        )
+        return
+    _redis = aioredis.Redis.from_url(REDIS_URL)
+    _redis_listener = asyncio.create_task(_listen_redis(_redis))
+    logger.info("Redis Pub/Sub enabled for room broadcasts (worker %s)", _WORKER_ID)
+
+
+@app.on_event("shutdown")
+async def stop_redis_bus() -> None:
+    global _redis, _redis_listener
+    if _redis_listener is not None:
+        _redis_listener.cancel()
+        try:
+            await _redis_listener
+        except asyncio.CancelledError:
+            pass
+        _redis_listener = None
+    if _redis is not None:
+        # aclose() replaced close() in redis-py 5.0.1; older clients only have close()
+        await getattr(_redis, "aclose", _redis.close)()
+        _redis = None
+
+
 @app.get("/health")
 def health() -> dict[str, str]:
     return {"status": "ok"}
@@ -308,13 +525,30 @@ def get_trip_cover_image(trip_id: str) -> dict[str, Any]:
     }
 
 
-@app.get("/trips/{trip_id}/messages")
+def _etag_matches(request: Request, etag: str) -> bool:
+    """True if the request's If-None-Match header names this (weak) ETag."""
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    return header.strip() == "*" or etag in (t.strip() for t in header.split(","))
+
+
+@app.get("/trips/{trip_id}/messages", response_model=None)
 def list_messages(
     trip_id: str,
+    request: Request,
     limit: int = Query(200, ge=1, le=500),
-) -> list[dict[str, Any]]:
-    """REST fallback: fetch message history for a trip."""
-    return get_messages(trip_id, limit=limit)
+) -> list[dict[str, Any]] | Response:
+    """REST fallback: fetch message history for a trip. Supports If-None-Match (304 when unchanged)."""
+    messages = get_messages(trip_id, limit=limit)
+    # Messages are append-only, so count + last id identifies the page
+    last_id = messages[-1]["id"] if messages else "0"
+    etag = f'W/"m-{len(messages)}-{last_id}"'
+    if _etag_matches(request, etag):
+        return Response(status_code=304, headers={"ETag": etag})
+    return Response(
+        orjson.dumps(messages), media_type="application/json", headers={"ETag": etag}
+    )
 
 
 class TripMediaItem(BaseModel):
@@ -332,33 +566,73 @@ def list_trip_media(trip_id: str) -> list[dict[str, Any]]:
     return get_trip_media(trip_id)
 
 
+# Media type by extension first: the native picker labels every asset image/<ext>, videos too
+_EXT_TO_TYPE: dict[str, str] = {
+    ".jpg": "image",
+    ".jpeg": "image",
+    ".png": "image",
+    ".gif": "image",
+    ".webp": "image",
+    ".heic": "image",
+    ".heif": "image",
+    ".mp4": "video",
+    ".mov": "video",
+    ".m4v": "video",
+    ".webm": "video",
+}
+_MAX_UPLOAD_BYTES = 200 * 1024 * 1024
+
+
+def _upload_media_type(file: UploadFile, file_ext: str) -> str | None:
+    """'image' or 'video' for an upload, or None when neither the extension nor content type fits."""
+    media_type = _EXT_TO_TYPE.get(file_ext.lower())
+    if media_type:
+        return media_type
+    content_type = file.content_type or ""
+    if content_type.startswith("video/"):
+        return "video"
+    if content_type.startswith("image/"):
+        return "image"
+    return None
+
+
+def _copy_upload(file: UploadFile, dest: Path) -> None:
+    with dest.open("wb") as f:
+        shutil.copyfileobj(file.file, f, 1 << 16)
+
+
 @app.post("/trips/{trip_id}/media/upload")
 async def upload_trip_media(
     trip_id: str,
     files: list[UploadFile] = File(...),
 ) -> list[dict[str, Any]]:
     """Upload media files for a trip. Returns list of media records with URLs."""
-    added = []
+    # Validate every file before writing any, so a bad batch leaves nothing on disk
+    accepted: list[tuple[UploadFile, str, str]] = []
     for file in files:
-        # Generate unique filename
         file_ext = Path(file.filename or "image.jpg").suffix
+        media_type = _upload_media_type(file, file_ext)
+        if media_type is None:
+            raise HTTPException(
+                status_code=415, detail=f"Unsupported media type: {file.filename}"
+            )
+        if file.size is not None and file.size > _MAX_UPLOAD_BYTES:
+            raise HTTPException(status_code=413, detail=f"File too large: {file.filename}")
+        accepted.append((file, file_ext, media_type))
+
+    items: list[tuple[str, str]] = []
+    for file, file_ext, media_type in accepted:
+        # Generate unique filename
         unique_filename = f"{uuid.uuid4()}{file_ext}"
         file_path = UPLOADS_DIR / unique_filename
 
-        # Save file
-        content = await file.read()
-        with open(file_path, "wb") as f:
-            f.write(content)
+        # Save file: copy the spooled upload to disk in 64 KB chunks off the event loop
+        await asyncio.to_thread(_copy_upload, file, file_path)
 
-        # Determine media type
-        content_type = file.content_type or ""
-        media_type = "video" if "video" in content_type else "image"
+        items.append((f"/uploads/{unique_filename}", media_type))
 
-        # Store in DB with URL path
-        uri = f"/uploads/{unique_filename}"
-        added.append(add_trip_media(trip_id, uri, media_type))
-
-    return added
+    # Store all records with their URL paths in one transaction
+    return await asyncio.to_thread(add_trip_media_bulk, trip_id, items)
 
 
 @app.get("/uploads/{filename}")
@@ -373,25 +647,45 @@ async def serve_upload(filename: str) -> FileResponse:
 @app.post("/trips/{trip_id}/media")
 def api_add_trip_media(trip_id: str, body: TripMediaBody) -> list[dict[str, Any]]:
     """Add media items to a trip. Each item has uri and type ('image' or 'video')."""
-    added = []
+    items: list[tuple[str, str]] = []
     for item in body.items:
         t = (item.type or "image").lower()
         if t not in ("image", "video"):
             t = "image"
-        added.append(add_trip_media(trip_id, item.uri, t))
-    return added
+        items.append((item.uri, t))
+    return add_trip_media_bulk(trip_id, items)
+
+
+@functools.lru_cache(maxsize=256)
+def _itinerary_fragment(raw: str) -> orjson.Fragment | None:
+    """Stored itinerary text as a Fragment to splice into a response, or None if it is not valid
+    JSON. Memoized by text, so each stored version is parsed once per process."""
+    try:
+        orjson.loads(raw)
+    except orjson.JSONDecodeError:
+        logger.warning("Stored itinerary is not valid JSON; sending none")
+        return None
+    return orjson.Fragment(raw)
 
 
-@app.get("/trips/{trip_id}/itinerary")
-def get_trip_itinerary(trip_id: str) -> dict[str, Any]:
-    """Return stored itinerary for a trip, or empty."""
+@app.get("/trips/{trip_id}/itinerary", response_model=None)
+def get_trip_itinerary(trip_id: str, request: Request) -> dict[str, Any] | Response:
+    """Return stored itinerary for a trip, or empty. Supports If-None-Match (304 when unchanged)."""
     raw = get_itinerary(trip_id)
     if not raw:
         return {"itinerary": None}
-    try:
-        return {"itinerary": json.loads(raw)}
-    except json.JSONDecodeError:
+    # Digest of the stored JSON: valid across restarts and workers, unlike an in-memory counter
+    etag = f'W/"i-{hashlib.blake2b(raw.encode(), digest_size=8).hexdigest()}"'
+    if _etag_matches(request, etag):
+        return Response(status_code=304, headers={"ETag": etag})
+    fragment = _itinerary_fragment(raw)
+    if fragment is None:
         return {"itinerary": None}
+    return Response(
+        orjson.dumps({"itinerary": fragment}),
+        media_type="application/json",
+        headers={"ETag": etag},
+    )
 
 
 class PutItineraryBody(BaseModel):
@@ -426,27 +720,30 @@ def _extract_destination_from_itinerary(itinerary: list[dict[str, Any]]) -> str
     return None
 
 
-def _set_trip_cover_from_destination(trip_id: str, destination: str) -> None:
-    """Look up a place photo for the destination and set it as the trip cover (Google Places API New)."""
+def _set_trip_cover_from_destination(
+    trip_id: str, destination: str
+) -> dict[str, Any] | None:
+    """Look up a place photo for the destination and set it as the trip cover (Google Places API New).
+    Returns the stored cover (photoName, attributions) or None if no cover was set."""
     if not (destination or "").strip():
-        return
+        return None
     dest = destination.strip()
     search_result = gp_search_places(query=dest, max_results=1)
     if search_result.get("error") or not search_result.get("results"):
-        return
+        return None
     place_id = search_result["results"][0].get("place_id")
     if not place_id:
-        return
+        return None
     place_data = gp_get_place_with_photos(place_id)
     if place_data.get("error"):
-        return
+        return None
     photos = place_data.get("photos") or []
     if not photos:
-        return
+        return None
     first = photos[0]
     photo_name = first.get("name")
     if not photo_name:
-        return
+        return None
     # authorAttributions: list of { displayName, uri } (Places API New)
     attributions = first.get("authorAttributions") or []
     attrs_out = [
@@ -455,6 +752,33 @@ def _set_trip_cover_from_destination(trip_id: str, destination: str) -> None:
     ]
     update_trip_destination(trip_id, dest)
     set_trip_cover(trip_id, place_id, photo_name, attrs_out)
+    return {"photoName": photo_name, "attributions": attrs_out}
+
+
+async def _set_trip_cover_and_notify(trip_id: str, destination: str) -> None:
+    """Background task: set trip cover from destination off the request path, then push
+    a trip_cover_updated frame so clients in the room can swap the cover without refetching."""
+    try:
+        cover = await asyncio.to_thread(
+            _set_trip_cover_from_destination, trip_id, destination
+        )
+        if not cover:
+            return
+        media = await asyncio.to_thread(
+            gp_get_photo_media, cover["photoName"], max_width_px=800
+        )
+    except Exception as e:
+        logger.warning("Set trip cover from destination failed: %s", e)
+        return
+    payload: dict[str, Any] = {
+        "type": "trip_cover_updated",
+        "trip_id": trip_id,
+        "destination": destination.strip(),
+        "attributions": cover["attributions"],
+    }
+    if not media.get("error") and media.get("photoUri"):
+        payload["photoUri"] = media["photoUri"]
+    await publish(trip_id, payload)
 
 
 def _set_trip_cover_from_query(trip_id: str, query: str) -> None:
@@ -497,12 +821,7 @@ def _llm_place_query_from_trip_name(trip_name: str) -> str | None:
         "If the title does not suggest any location or place, reply with exactly: NONE"
     )
     try:
-        from openai import OpenAI
-
-        client = OpenAI(
-            base_url="https://openrouter.ai/api/v1",
-            api_key=OPENROUTER_API_KEY,
-        )
+        client = _openrouter_client()
         response = client.chat.completions.create(
             model=OPENROUTER_MODEL,
             messages=[{"role": "user", "content": prompt}],
@@ -533,30 +852,29 @@ def _set_trip_cover_from_trip_name(trip_id: str, trip_name: str) -> None:
 
 
 @app.put("/trips/{trip_id}/itinerary")
-async def put_trip_itinerary(trip_id: str, body: PutItineraryBody) -> dict[str, Any]:
-    """Save itinerary for a trip and broadcast to all clients in the trip's WebSocket room."""
-    normalized = (
-        _parse_itinerary_json(json.dumps(body.itinerary)) if body.itinerary else None
-    )
+async def put_trip_itinerary(
+    trip_id: str, body: PutItineraryBody, background_tasks: BackgroundTasks
+) -> dict[str, Any]:
+    """Save itinerary for a trip and broadcast to all clients in the trip's WebSocket room.
+    The cover image lookup runs in the background; clients get a trip_cover_updated frame when it lands."""
+    normalized = _normalize_itinerary(body.itinerary)
     if not normalized:
         raise HTTPException(status_code=400, detail="Invalid itinerary")
-    set_itinerary(trip_id, json.dumps(normalized))
+    itinerary_json = orjson.dumps(normalized).decode()
+    await asyncio.to_thread(set_itinerary, trip_id, itinerary_json)
     destination = _extract_destination_from_itinerary(normalized)
     if destination:
-        try:
-            _set_trip_cover_from_destination(trip_id, destination)
-        except Exception:
-            pass  # non-fatal: cover is optional
-    room = get_room(trip_id)
-    payload = {"type": "itinerary", "trip_id": trip_id, "itinerary": normalized}
-    dead = set()
-    for ws in room:
-        try:
-            await ws.send_json(payload)
-        except Exception:
-            dead.add(ws)
-    for ws in dead:
-        room.discard(ws)
+        background_tasks.add_task(_set_trip_cover_and_notify, trip_id, destination)
+    # Serialize once for the whole room (reusing the stored JSON); text frames keep the
+    # client's JSON.parse path unchanged
+    payload = orjson.dumps(
+        {
+            "type": "itinerary",
+            "trip_id": trip_id,
+            "itinerary": orjson.Fragment(itinerary_json),
+        }
+    ).decode()
+    await publish(trip_id, payload)
     return {"ok": True}
 
 
@@ -567,10 +885,10 @@ def add_to_plan_resolve(trip_id: str, body: AddToPlanResolveBody) -> dict[str, A
     current_itinerary: list[dict] = []
     if raw:
         try:
-            current_itinerary = json.loads(raw)
+            current_itinerary = orjson.loads(raw)
             if not isinstance(current_itinerary, list):
                 current_itinerary = []
-        except json.JSONDecodeError:
+        except orjson.JSONDecodeError:
             pass
     suggestion = body.suggestion.model_dump()
     itinerary = _apply_suggestion_to_itinerary(current_itinerary, suggestion)
@@ -624,8 +942,6 @@ def api_distance_matrix(body: DistanceMatrixBody) -> dict[str, Any]:
 @app.get("/places/geocode")
 def api_geocode(address: str = Query(..., min_length=1)) -> dict[str, Any]:
     """Convert an address or place name to latitude/longitude coordinates."""
-    from google_places import geocode_address as gp_geocode_address
-
     return gp_geocode_address(address)
 
 
@@ -720,6 +1036,57 @@ def api_search_hotels(
 # --- OpenRouter (@gemini) integration: google/gemini-3-flash-preview via OpenRouter API (OpenAI-compatible) ---
 OPENROUTER_MODEL = "google/gemini-3-flash-preview"
 
+
+@functools.lru_cache(maxsize=1)
+def _openrouter_client() -> Any:
+    """Shared OpenRouter client, built on first use. One pooled httpx client keeps TLS
+    connections to openrouter.ai alive across chat, add-to-plan, cover and OCR calls."""
+    return OpenAI(
+        base_url="https://openrouter.ai/api/v1",
+        api_key=OPENROUTER_API_KEY,
+        http_client=httpx.Client(
+            limits=httpx.Limits(max_keepalive_connections=20, max_connections=50),
+            timeout=httpx.Timeout(120.0, connect=10.0),
+        ),
+    )
+
+# ASCII-only lowercasing keeps indexes aligned with the original text (str.lower() can change
+# the length of some non-ASCII strings); tag names are ASCII so this is all matching needs.
+_ASCII_LOWER = str.maketrans({c: c + 32 for c in range(ord("A"), ord("Z") + 1)})
+
+
+def _extract_tags(text: str, tags: tuple[str, ...]) -> dict[str, str]:
+    """Case-insensitive <tag>...</tag> extraction with str.find on one lowered copy of text.
+    Returns {tag: stripped inner text} for the first complete occurrence of each tag found."""
+    lowered = text.translate(_ASCII_LOWER)
+    out: dict[str, str] = {}
+    for tag in tags:
+        open_tag = f"<{tag}>"
+        start = lowered.find(open_tag)
+        if start == -1:
+            continue
+        start += len(open_tag)
+        end = lowered.find(f"</{tag}>", start)
+        if end == -1:
+            continue
+        out[tag] = text[start:end].strip()
+    return out
+
+
+def _strip_json_fence(raw: str) -> str:
+    """Inner text of the first ```json ... ``` (or bare ```) fence in raw, else raw unchanged."""
+    start = raw.find("```")
+    if start == -1:
+        return raw
+    start += 3
+    if raw.startswith("json", start):
+        start += 4
+    end = raw.find("```", start)
+    if end == -1:
+        return raw
+    return raw[start:end].strip()
+
+
 SYSTEM_INSTRUCTION = """You are a helpful trip-planning assistant in a group chat. When users mention you with @gemini, you must FIRST decide what action to take, then respond in the required format.
 
 ## Step 1: Determine the action
@@ -789,6 +1156,7 @@ Itinerary JSON structure (each day: id, dayNumber, title, date required in YYYY-
 When the user wants to create or update an itinerary, use the provided tools to make the plan realistic:
 1. **search_places**: Search for real venues (museums, restaurants, landmarks—not hotel pricing). Use for "Academy of Sciences San Francisco", "breakfast cafe Napa", etc. Do NOT use for "hotels in X" or "where to stay"; use search_hotels (Amadeus) for those. Returns place_id, name, address for activities.
 2. **search_food_places**: Search for restaurants by food type and city (e.g. food_type="sushi", location="San Francisco"). Use when the user wants a meal (lunch, dinner, breakfast) but didn't name a specific place. Returns name, address, rating. If unsure which restaurant to add, call this and then ask the user in your response: list the options with name, full address, and rating and ask which they prefer or if you should add the top-rated one.
+   **search_food_places_batch**: Same search for several meals in one call (a list of food_type, location, day_label, time). When the user wants more than one meal (e.g. "meals for a 3-day trip", "lunch and dinner on Day 1"), use this once instead of calling search_food_places per meal.
 3. **get_place_details**: After search_places or search_food_places, call this with a place_id to get opening hours (weekday_text), full address, rating, user_ratings_total. Use for every place you add so the itinerary has real name, address, and rating.
 4. **get_distance_matrix**: Given two or more addresses or place names (or "lat,lng"), get driving/walking distance and duration between them. Use this to ensure travel time between activities is realistic and to order activities logically.
 5. **get_directions**: Get a full route between two places (or A→B via waypoints) with estimated drive/walk time and distance. Use for roadtrip planning: e.g. "San Francisco to LA", "NYC to Boston via Philadelphia". Returns total duration, total distance, and per-leg breakdown. Prefer this when the user asks for a road trip, driving route, or "how long to drive from X to Y".
@@ -824,6 +1192,19 @@ For ANY meal or food place (breakfast, lunch, dinner, cafe, sushi, seafood, etc.
 
 3. **When you're not sure which restaurant to pick**: If the user said something like "add a sushi lunch" or "dinner at a seafood place" or "2 meals" / "surprises for Day 1 and Day 2" without naming venues, call search_food_places (or search_places) and get real options. Then in your <response>, list options and clearly say which are for which day and time (e.g. "For Day 1 dinner near Alcatraz: Fog Harbor, Scoma's. For Day 2 lunch at Ferry Building: Gott's, Slanted Door."). You MUST output a <suggestions> block with one object per option. When **adding** (not replacing): every suggestion MUST have **dayLabel** (e.g. "Day 1", "Day 2") and **time** (e.g. "6:00 PM", "12:00 PM") so the app adds each to the correct day and time. When the user asks for multiple meals/days, output multiple suggestions—each with its own dayLabel and time—so each option maps to the right slot. When **replacing** an existing activity, include replaceActivityId and/or replaceTitle instead. Always include title, description, location; when adding, always include dayLabel and time. The app shows "Add to plan" or "Replace with this" and displays the day/time per option. Do NOT add generic placeholders—always use real data from your search."""
 
+# System message built once at import and shared by every @gemini call. The static prompt is the
+# request prefix, so mark it cacheable (OpenRouter prompt caching) to avoid re-billing it each turn.
+_SYSTEM_MESSAGE: dict[str, Any] = {
+    "role": "system",
+    "content": [
+        {
+            "type": "text",
+            "text": SYSTEM_INSTRUCTION,
+            "cache_control": {"type": "ephemeral"},
+        }
+    ],
+}
+
 
 # OpenAI-format tools for OpenRouter (Places search, details, distance)
 PLACES_TOOLS: list[dict[str, Any]] = [
@@ -896,6 +1277,50 @@ PLACES_TOOLS: list[dict[str, Any]] = [
             },
         },
     },
+    {
+        "type": "function",
+        "function": {
+            "name": "search_food_places_batch",
+            "description": "Run several search_food_places searches at once, one per meal slot (e.g. Day 1 lunch, Day 1 dinner, Day 2 breakfast). Use this instead of repeated search_food_places calls when planning multiple meals. Returns one entry per query, in order, each with day_label, time, food_type and its results (name, formatted_address, rating, user_ratings_total, place_id).",
+            "parameters": {
+                "type": "object",
+                "properties": {
+                    "queries": {
+                        "type": "array",
+                        "description": "One object per meal to search for (max 10).",
+                        "items": {
+                            "type": "object",
+                            "properties": {
+                                "food_type": {
+                                    "type": "string",
+                                    "description": "Type of food or meal, e.g. 'sushi', 'breakfast'",
+                                },
+                                "location": {
+                                    "type": "string",
+                                    "description": "City or area; use trip destination when possible.",
+                                },
+                                "day_label": {
+                                    "type": "string",
+                                    "description": "Day this meal is for, e.g. 'Day 1'",
+                                },
+                                "time": {
+                                    "type": "string",
+                                    "description": "Meal time, e.g. '12:00 PM'",
+                                },
+                            },
+                            "required": ["food_type", "location"],
+                        },
+                    },
+                    "max_results": {
+                        "type": "integer",
+                        "description": "Max results per query (default 5)",
+                        "default": 5,
+                    },
+                },
+                "required": ["queries"],
+            },
+        },
+    },
     {
         "type": "function",
         "function": {
@@ -1024,22 +1449,192 @@ PLACES_TOOLS: list[dict[str, Any]] = [
 
 def _log_tool_result(name: str, arguments: dict[str, Any], out: dict[str, Any]) -> None:
     """Log API call args and result for debugging (Google Maps, Amadeus, etc.)."""
+    if not logger.isEnabledFor(logging.INFO):
+        return
     try:
-        result_str = json.dumps(out, indent=2, default=str)
-        if len(result_str) > 3000:
-            result_str = result_str[:3000] + "\n... (truncated)"
+        result_bytes = orjson.dumps(
+            out, default=str, option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS
+        )
+        if len(result_bytes) > 3000:
+            result_str = result_bytes[:3000].decode("utf-8", "ignore") + "\n... (truncated)"
+        else:
+            result_str = result_bytes.decode()
         logger.info(
             "[API] %s | args=%s | result=%s",
             name,
-            json.dumps(arguments, default=str),
+            orjson.dumps(arguments, default=str).decode(),
             result_str,
         )
     except Exception:
         logger.info("[API] %s | args=%s | result=(serialize failed)", name, arguments)
 
 
+# Tool calls from one model round are independent network lookups; run them side by side.
+_TOOL_POOL = ThreadPoolExecutor(max_workers=8, thread_name_prefix="tool")
+# Speculative detail lookups get their own small pool so they never queue ahead of real calls
+_PREFETCH_POOL = ThreadPoolExecutor(max_workers=2, thread_name_prefix="prefetch")
+
+# Process-level TTL cache of tool results: (name, sorted-args JSON) -> (result JSON, expires_at).
+# The prompt asks for get_place_details on every place added, so one itinerary build repeats
+# lookups a lot. Place data is near-static; prices and availability go stale quickly.
+_TOOL_CACHE_TTL: dict[str, float] = {
+    "get_place_details": 24 * 3600,
+    "search_places": 3600,
+    "search_food_places": 3600,
+    "get_distance_matrix": 3600,
+    "get_directions": 3600,
+    "search_flights": 600,
+    "search_hotels": 600,
+}
+_TOOL_CACHE_MAX = 4096
+_tool_cache: dict[tuple[str, bytes], tuple[str, float]] = {}
+# Prefetches not finished yet, by cache key, so a real call can wait instead of fetching again
+_prefetch_inflight: dict[tuple[str, bytes], Future[str]] = {}
+_tool_cache_lock = threading.Lock()
+
+
+def _tool_cache_key(name: str, arguments: dict[str, Any]) -> tuple[str, bytes] | None:
+    if name not in _TOOL_CACHE_TTL:
+        return None
+    try:
+        return name, orjson.dumps(arguments, option=orjson.OPT_SORT_KEYS)
+    except TypeError:
+        return None
+
+
+def _tool_cache_get(key: tuple[str, bytes]) -> str | None:
+    with _tool_cache_lock:
+        hit = _tool_cache.get(key)
+        if hit is None:
+            return None
+        result, expires_at = hit
+        if expires_at <= time.time():
+            del _tool_cache[key]
+            return None
+        return result
+
+
+def _tool_cache_put(key: tuple[str, bytes], result: str) -> None:
+    with _tool_cache_lock:
+        if key not in _tool_cache and len(_tool_cache) >= _TOOL_CACHE_MAX:
+            # Evict the oldest entry (dicts keep insertion order)
+            del _tool_cache[next(iter(_tool_cache))]
+        _tool_cache[key] = (result, time.time() + _TOOL_CACHE_TTL[key[0]])
+
+
+_PREFETCH_DETAILS_TOP_K = 5
+
+# Fields the prompt never reads; vicinity just repeats formatted_address.
+_TOOL_OUTPUT_DROP = frozenset({"vicinity"})
+
+
+def _compact_tool_output(value: Any) -> Any:
+    """Drop null and unused fields from a tool result so fewer tokens go back to the model."""
+    if isinstance(value, dict):
+        return {
+            k: _compact_tool_output(v)
+            for k, v in value.items()
+            if v is not None and k not in _TOOL_OUTPUT_DROP
+        }
+    if isinstance(value, list):
+        return [_compact_tool_output(v) for v in value]
+    return value
+
+
+def _prefetch_place_details(out: dict[str, Any]) -> None:
+    """Warm the tool cache with details for the top search results; the model almost always asks
+    for get_place_details on them next round. Fire-and-forget on the prefetch pool."""
+    for r in (out.get("results") or [])[:_PREFETCH_DETAILS_TOP_K]:
+        place_id = r.get("place_id")
+        if not place_id:
+            continue
+        arguments = {"place_id": place_id}
+        key = _tool_cache_key("get_place_details", arguments)
+        if key is None or _tool_cache_get(key) is not None:
+            continue
+        with _tool_cache_lock:
+            if key in _prefetch_inflight:
+                continue
+            future = _PREFETCH_POOL.submit(_run_tool, "get_place_details", arguments, key)
+            _prefetch_inflight[key] = future
+        future.add_done_callback(lambda _f, key=key: _forget_prefetch(key))
+
+
+def _forget_prefetch(key: tuple[str, bytes]) -> None:
+    with _tool_cache_lock:
+        _prefetch_inflight.pop(key, None)
+
+
+def _await_prefetch(key: tuple[str, bytes]) -> str | None:
+    """Result of a running prefetch for key, or None if there is none. A prefetch still queued
+    is cancelled instead: the caller is on the critical path and fetches it directly."""
+    with _tool_cache_lock:
+        future = _prefetch_inflight.get(key)
+    if future is None or future.cancel():
+        return None
+    try:
+        return future.result()
+    except CancelledError:
+        return None
+
+
+_FOOD_BATCH_MAX_QUERIES = 10
+
+
+def _search_food_places_batch(arguments: dict[str, Any]) -> dict[str, Any]:
+    """Run each meal query as a search_food_places call (cached + prefetching) concurrently.
+    Uses its own short-lived executor: the caller may already be a _TOOL_POOL worker."""
+    queries = [q for q in (arguments.get("queries") or []) if isinstance(q, dict)]
+    queries = queries[:_FOOD_BATCH_MAX_QUERIES]
+    if not queries:
+        return {"error": "queries is required", "results": []}
+    max_results = int(arguments.get("max_results", 5))
+    sub_args = [
+        {
+            "food_type": q.get("food_type") or "",
+            "location": q.get("location") or "",
+            "max_results": max_results,
+        }
+        for q in queries
+    ]
+    with ThreadPoolExecutor(max_workers=len(sub_args)) as pool:
+        raw = list(
+            pool.map(_execute_tool, ["search_food_places"] * len(sub_args), sub_args)
+        )
+    results = []
+    for q, r in zip(queries, raw):
+        found = orjson.loads(r)
+        results.append(
+            {
+                "day_label": q.get("day_label"),
+                "time": q.get("time"),
+                "food_type": q.get("food_type"),
+                "location": q.get("location"),
+                **found,
+            }
+        )
+    return {"results": results}
+
+
 def _execute_tool(name: str, arguments: dict[str, Any]) -> str:
     """Run a single tool by name and return JSON string result for the LLM."""
+    cache_key = _tool_cache_key(name, arguments)
+    if cache_key is not None:
+        cached = _tool_cache_get(cache_key)
+        if cached is not None:
+            logger.info("[API] %s | args=%s | cache hit", name, arguments)
+            return cached
+        pending = _await_prefetch(cache_key)
+        if pending is not None:
+            logger.info("[API] %s | args=%s | joined prefetch", name, arguments)
+            return pending
+    return _run_tool(name, arguments, cache_key)
+
+
+def _run_tool(
+    name: str, arguments: dict[str, Any], cache_key: tuple[str, bytes] | None
+) -> str:
+    """Uncached body of _execute_tool: call the API, compact the output, store it under cache_key."""
     try:
         if name == "search_places":
             out = gp_search_places(
@@ -1048,6 +1643,7 @@ def _execute_tool(name: str, arguments: dict[str, Any]) -> str:
                 max_results=int(arguments.get("max_results", 5)),
             )
             _log_tool_result(name, arguments, out)
+            _prefetch_place_details(out)
         elif name == "search_food_places":
             food_type = (arguments.get("food_type") or "").strip()
             location = (arguments.get("location") or "").strip()
@@ -1060,7 +1656,10 @@ def _execute_tool(name: str, arguments: dict[str, Any]) -> str:
                     location=location,
                     max_results=int(arguments.get("max_results", 5)),
                 )
+                _prefetch_place_details(out)
             _log_tool_result(name, arguments, out)
+        elif name == "search_food_places_batch":
+            out = _search_food_places_batch(arguments)
         elif name == "get_place_details":
             out = gp_get_place_details(place_id=arguments.get("place_id", ""))
             _log_tool_result(name, arguments, out)
@@ -1101,32 +1700,125 @@ def _execute_tool(name: str, arguments: dict[str, Any]) -> str:
         else:
             out = {"error": f"Unknown tool: {name}"}
             _log_tool_result(name, arguments, out)
-        return json.dumps(out)
+        # Compact separators and raw UTF-8 (no \uXXXX escapes) keep the tool message short
+        result = orjson.dumps(_compact_tool_output(out)).decode()
+        if cache_key is not None and isinstance(out, dict) and not out.get("error"):
+            _tool_cache_put(cache_key, result)
+        return result
     except Exception as e:
         logger.exception("Tool %s failed: %s", name, e)
         _log_tool_result(name, arguments, {"error": str(e)})
-        return json.dumps({"error": str(e)})
+        return orjson.dumps({"error": str(e)}).decode()
 
 
-def _build_chat_messages(history: list[dict]) -> list[dict]:
-    """Build messages list for OpenRouter/OpenAI chat API from chat history. Includes message timestamps."""
-    messages = []
+def _build_chat_message(m: dict) -> dict | None:
+    """One history row as an OpenRouter/OpenAI chat message, or None if it has no text."""
+    role = "assistant" if m.get("is_ai") else "user"
+    name = (m.get("user_name") or "User").strip()
+    text = (m.get("content") or "").strip()
+    if not text:
+        return None
+    ts = m.get("created_at", "")
+    prefix = f"[{ts}] " if ts else ""
+    return {"role": role, "content": f"{prefix}{name}: {text}"}
+
+
+# trip_id -> {message id: built message or None}. Messages are immutable, so each @gemini turn
+# only formats rows that were not in the previous turn's window for that trip.
+_chat_messages_cache: dict[str, dict[str, dict | None]] = {}
+_CHAT_MESSAGES_CACHE_MAX = 256
+
+# Sliding window of chat history sent to the model: at most this many messages, trimmed further
+# from the oldest end to stay under ~8k tokens (estimated at 4 characters per token)
+CHAT_HISTORY_MAX_MESSAGES = 30
+_CHAT_HISTORY_MAX_CHARS = 32_000
+
+
+def _build_chat_messages(history: list[dict], trip_id: str | None = None) -> list[dict]:
+    """Build messages list for OpenRouter/OpenAI chat API from chat history. Includes message timestamps.
+    Keeps only the most recent window (CHAT_HISTORY_MAX_MESSAGES / _CHAT_HISTORY_MAX_CHARS).
+    With trip_id, reuses the messages built for that trip's previous window."""
+    history = history[-CHAT_HISTORY_MAX_MESSAGES:]
+    cached = _chat_messages_cache.pop(trip_id, {}) if trip_id is not None else {}
+    built: dict[str, dict | None] = {}
+    out: list[dict] = []
     for m in history:
-        role = "assistant" if m.get("is_ai") else "user"
-        name = (m.get("user_name") or "User").strip()
-        text = (m.get("content") or "").strip()
-        if not text:
-            continue
-        ts = m.get("created_at", "")
-        prefix = f"[{ts}] " if ts else ""
-        msg_text = f"{prefix}{name}: {text}"
-        messages.append({"role": role, "content": msg_text})
-    return messages
-
+        mid = m.get("id")
+        msg = cached[mid] if mid in cached else _build_chat_message(m)
+        if mid is not None:
+            built[mid] = msg
+        if msg is not None:
+            out.append(msg)
+    if trip_id is not None:
+        if len(_chat_messages_cache) >= _CHAT_MESSAGES_CACHE_MAX:
+            del _chat_messages_cache[next(iter(_chat_messages_cache))]
+        _chat_messages_cache[trip_id] = built
+    # Drop the oldest messages past the character budget, always keeping the latest one
+    total = sum(len(m["content"]) for m in out)
+    start = 0
+    while total > _CHAT_HISTORY_MAX_CHARS and start < len(out) - 1:
+        total -= len(out[start]["content"])
+        start += 1
+    return out[start:]
+
+
+EMPTY_RESPONSE_MESSAGE = "I couldn't generate a response. Please try again."
 
 ITINERARY_DONE_MESSAGE = "I've added your itinerary to the Plan tab! Check the Plan tab to see the full schedule."
 
-JSON_ONLY_PROMPT = """Output ONLY a valid JSON array for the COMPLETE trip itinerary. Include ALL days and activities from the current itinerary in the context above, plus any additions you are making (e.g. flight times). No markdown, no code fence, no other text. Format: [{"id":"day-1","dayNumber":1,"title":"Day 1","date":"YYYY-MM-DD","activities":[{"id":"act-1","time":"9:00 AM","title":"Title","description":"","location":""}]}]. Each day: id, dayNumber, title, date (required, YYYY-MM-DD), activities. Each activity: id, time, title, description, location."""
+JSON_ONLY_PROMPT = """Output ONLY a JSON object {"itinerary": [...]} holding the COMPLETE trip itinerary. Include ALL days and activities from the current itinerary in the context above, plus any additions you are making (e.g. flight times). No markdown, no code fence, no other text. Format: {"itinerary":[{"id":"day-1","dayNumber":1,"title":"Day 1","date":"YYYY-MM-DD","activities":[{"id":"act-1","time":"9:00 AM","title":"Title","description":"","location":""}]}]}. Each day: id, dayNumber, title, date (required, YYYY-MM-DD), activities. Each activity: id, time, title, description, location."""
+
+# Structured-output schema for the JSON-only retry, so the model can't answer with prose or a fence
+_SCHEMA_STR = {"type": "string"}
+ITINERARY_RESPONSE_FORMAT: dict[str, Any] = {
+    "type": "json_schema",
+    "json_schema": {
+        "name": "itinerary",
+        "strict": True,
+        "schema": {
+            "type": "object",
+            "properties": {
+                "itinerary": {
+                    "type": "array",
+                    "items": {
+                        "type": "object",
+                        "properties": {
+                            "id": _SCHEMA_STR,
+                            "dayNumber": {"type": "integer"},
+                            "title": _SCHEMA_STR,
+                            "date": _SCHEMA_STR,
+                            "activities": {
+                                "type": "array",
+                                "items": {
+                                    "type": "object",
+                                    "properties": {
+                                        "id": _SCHEMA_STR,
+                                        "time": _SCHEMA_STR,
+                                        "title": _SCHEMA_STR,
+                                        "description": _SCHEMA_STR,
+                                        "location": _SCHEMA_STR,
+                                    },
+                                    "required": [
+                                        "id",
+                                        "time",
+                                        "title",
+                                        "description",
+                                        "location",
+                                    ],
+                                    "additionalProperties": False,
+                                },
+                            },
+                        },
+                        "required": ["id", "dayNumber", "title", "date", "activities"],
+                        "additionalProperties": False,
+                    },
+                }
+            },
+            "required": ["itinerary"],
+            "additionalProperties": False,
+        },
+    },
+}
 
 TRIP_INFO_PREFIX = """=== CONTEXT ===
 This conversation is about the trip "{name}".
@@ -1154,6 +1846,8 @@ ITINERARY_CONTEXT_SUFFIX = """
 
 """
 
+NO_ITINERARY_CONTEXT = "=== CONTEXT ===\nThere is no itinerary in the Plan tab yet. If the user asks what the plan is, say they don't have one yet and offer to help create one.\n\n--- Conversation: ---\n\n"
+
 ADD_TO_PLAN_RESOLVE_PROMPT = """You are resolving an "add to plan" action. The user tapped a button to add or replace an activity in their trip itinerary.
 
 **Current itinerary (JSON):**
@@ -1187,6 +1881,12 @@ Itinerary format: list of days, each with id, dayNumber, title, date (optional),
 """
 
 
+_RESOLVE_SYSTEM_MESSAGE: dict[str, Any] = {
+    "role": "system",
+    "content": "You output only the requested XML tags and JSON. No other text.",
+}
+
+
 def _call_add_to_plan_resolve_sync(
     current_itinerary: list[dict],
     suggestion: dict[str, Any],
@@ -1199,15 +1899,16 @@ def _call_add_to_plan_resolve_sync(
             "action": "add",
             "itinerary": _apply_suggestion_to_itinerary(current_itinerary, suggestion),
         }
+    if _suggestion_slot_is_free(current_itinerary, suggestion):
+        # Nothing nearby to conflict with; skip the model round-trip
+        return {
+            "action": "add",
+            "itinerary": _apply_suggestion_to_itinerary(current_itinerary, suggestion),
+        }
     try:
-        from openai import OpenAI
-
-        client = OpenAI(
-            base_url="https://openrouter.ai/api/v1",
-            api_key=OPENROUTER_API_KEY,
-        )
+        client = _openrouter_client()
         prompt = ADD_TO_PLAN_RESOLVE_PROMPT.format(
-            current_itinerary_json=json.dumps(current_itinerary, indent=2),
+            current_itinerary_json=orjson.dumps(current_itinerary).decode(),
             title=suggestion.get("title") or "",
             description=suggestion.get("description") or "",
             location=suggestion.get("location") or "",
@@ -1216,27 +1917,38 @@ def _call_add_to_plan_resolve_sync(
             replace_activity_id=suggestion.get("replaceActivityId") or "",
             replace_title=suggestion.get("replaceTitle") or "",
         )
-        api_messages = [
-            {
-                "role": "system",
-                "content": "You output only the requested XML tags and JSON. No other text.",
-            },
-            {"role": "user", "content": prompt},
-        ]
-        response = client.chat.completions.create(
+        api_messages = [_RESOLVE_SYSTEM_MESSAGE, {"role": "user", "content": prompt}]
+        stream = client.chat.completions.create(
             model=OPENROUTER_MODEL,
             messages=api_messages,
-            max_tokens=4096,
+            max_tokens=2048,
             temperature=0.3,
+            stream=True,
         )
-        if not response or not response.choices:
+        # Stop reading once the answer's last tag has closed instead of waiting for the end
+        parts: list[str] = []
+        tail = ""
+        try:
+            for chunk in stream:
+                if not chunk.choices:
+                    continue
+                delta = chunk.choices[0].delta.content or ""
+                if not delta:
+                    continue
+                parts.append(delta)
+                tail = (tail + delta)[-64:].lower()
+                if "</itinerary>" in tail or "</resolution_options>" in tail:
+                    break
+        finally:
+            stream.close()
+        text = "".join(parts).strip()
+        if not text:
             return {
                 "action": "add",
                 "itinerary": _apply_suggestion_to_itinerary(
                     current_itinerary, suggestion
                 ),
             }
-        text = (response.choices[0].message.content or "").strip()
         return _parse_add_to_plan_resolve_response(text, current_itinerary, suggestion)
     except Exception as e:
         logger.exception("Add-to-plan resolve LLM error: %s", e)
@@ -1246,6 +1958,62 @@ def _call_add_to_plan_resolve_sync(
         }
 
 
+def _find_target_day(
+    current_itinerary: list[dict], suggestion: dict[str, Any], fallback: bool = True
+) -> dict | None:
+    """Day whose title or date contains the suggestion's dayLabel; else the first day (or None).
+    With fallback=False, returns None unless the dayLabel actually matches a day."""
+    day_label = (suggestion.get("dayLabel") or "").strip().lower()
+    if day_label:
+        for d in current_itinerary:
+            if (
+                day_label in (d.get("title") or "").lower()
+                or day_label in (d.get("date") or "").lower()
+            ):
+                return d
+    if not fallback:
+        return None
+    return current_itinerary[0] if current_itinerary else None
+
+
+# Activities closer than this to the suggested time may clash; let the model judge them.
+_ADD_TO_PLAN_MIN_GAP_MINUTES = 90
+# Suggestions that usually span hours or constrain neighbouring events (travel, check-in/out).
+_LONG_ACTIVITY_RE = re.compile(
+    r"\b(flight|fly|flying|depart\w*|arriv\w*|land\w*|train|ferry|cruise|drive|check[- ]?(in|out))\b",
+    re.IGNORECASE,
+)
+
+
+def _suggestion_slot_is_free(current_itinerary: list[dict], suggestion: dict[str, Any]) -> bool:
+    """True when adding the suggestion clearly cannot conflict: a plain add (not a replace) with an
+    explicit dayLabel and parseable time, no activity on that day within the minimum gap, and not a
+    travel item."""
+    if (suggestion.get("replaceActivityId") or "").strip() or (
+        suggestion.get("replaceTitle") or ""
+    ).strip():
+        return False
+    if not (suggestion.get("dayLabel") or "").strip():
+        return False
+    minutes = _parse_time_to_minutes(suggestion.get("time") or "")
+    if minutes == 9999:
+        return False
+    text = f"{suggestion.get('title') or ''} {suggestion.get('description') or ''}"
+    if _LONG_ACTIVITY_RE.search(text):
+        return False
+    if not current_itinerary:
+        return True
+    day = _find_target_day(current_itinerary, suggestion, fallback=False)
+    if day is None:
+        # Label doesn't name an existing day; let the model decide where it goes
+        return False
+    for a in day.get("activities") or []:
+        other = _activity_minutes(a)
+        if other != 9999 and abs(other - minutes) < _ADD_TO_PLAN_MIN_GAP_MINUTES:
+            return False
+    return True
+
+
 def _apply_suggestion_to_itinerary(
     current_itinerary: list[dict], suggestion: dict[str, Any]
 ) -> list[dict]:
@@ -1253,7 +2021,7 @@ def _apply_suggestion_to_itinerary(
     Inserts new activities at the correct chronological position within the day.
     Uses dayLabel and time from the suggestion; does not rely on LLM placement."""
     new_act = {
-        "id": f"act-{uuid.uuid4().hex[:12]}",
+        "id": f"act-{_WORKER_ID}{next(_act_ids):x}",
         "time": (suggestion.get("time") or "").strip() or None,
         "title": (suggestion.get("title") or "").strip() or "Activity",
         "description": (suggestion.get("description") or "").strip() or None,
@@ -1262,23 +2030,30 @@ def _apply_suggestion_to_itinerary(
     replace_id = (suggestion.get("replaceActivityId") or "").strip()
     replace_title = (suggestion.get("replaceTitle") or "").strip()
     if replace_id or replace_title:
+        # One pass to index activities by id and by normalized title (first occurrence wins)
+        by_id: dict[str, tuple[dict, dict]] = {}
+        by_title: dict[str, tuple[dict, dict]] = {}
         for day in current_itinerary:
             for a in day.get("activities") or []:
-                if (replace_id and a.get("id") == replace_id) or (
-                    replace_title
-                    and (a.get("title") or "").strip().lower() == replace_title.lower()
-                ):
-                    a.update(new_act)
-                    a["id"] = a.get("id") or new_act["id"]
-                    day["activities"] = _sort_activities_chronologically(
-                        day.get("activities") or []
-                    )
-                    return current_itinerary
+                if a.get("id"):
+                    by_id.setdefault(a["id"], (day, a))
+                by_title.setdefault((a.get("title") or "").strip().lower(), (day, a))
+        hit = (replace_id and by_id.get(replace_id)) or (
+            replace_title and by_title.get(replace_title.lower())
+        )
+        if hit:
+            day, a = hit
+            acts = day["activities"]
+            acts.remove(a)
+            a.update(new_act)
+            a["id"] = a.get("id") or new_act["id"]
+            _insert_chronologically(acts, a)
+            return current_itinerary
         # replace target not found, add to first day
         if current_itinerary:
-            acts = current_itinerary[0].setdefault("activities", [])
-            acts.append(new_act)
-            current_itinerary[0]["activities"] = _sort_activities_chronologically(acts)
+            _insert_chronologically(
+                current_itinerary[0].setdefault("activities", []), new_act
+            )
         else:
             current_itinerary = [
                 {
@@ -1290,17 +2065,7 @@ def _apply_suggestion_to_itinerary(
                 }
             ]
         return current_itinerary
-    day_label = (suggestion.get("dayLabel") or "").strip().lower()
-    target_day = None
-    for d in current_itinerary:
-        if day_label and (
-            (d.get("title") or "").lower().find(day_label) >= 0
-            or ((d.get("date") or "") or "").lower().find(day_label) >= 0
-        ):
-            target_day = d
-            break
-    if not target_day and current_itinerary:
-        target_day = current_itinerary[0]
+    target_day = _find_target_day(current_itinerary, suggestion)
     if not target_day:
         return [
             {
@@ -1311,9 +2076,7 @@ def _apply_suggestion_to_itinerary(
                 "activities": [new_act],
             }
         ]
-    acts = target_day.setdefault("activities", [])
-    acts.append(new_act)
-    target_day["activities"] = _sort_activities_chronologically(acts)
+    _insert_chronologically(target_day.setdefault("activities", []), new_act)
     return current_itinerary
 
 
@@ -1326,35 +2089,16 @@ def _parse_add_to_plan_resolve_response(
             "action": "add",
             "itinerary": _apply_suggestion_to_itinerary(current_itinerary, suggestion),
         }
-    resolution_match = re.search(
-        r"<resolution>\s*(.+?)\s*</resolution>", text, re.DOTALL | re.IGNORECASE
+    tags = _extract_tags(
+        text, ("resolution", "message", "resolution_options", "itinerary")
     )
-    resolution = (
-        resolution_match.group(1).strip().lower() if resolution_match else ""
-    ).replace(" ", "_")
+    resolution = tags.get("resolution", "").lower().replace(" ", "_")
     if resolution == "conflict":
-        message_match = re.search(
-            r"<message>\s*([\s\S]*?)\s*</message>", text, re.DOTALL | re.IGNORECASE
-        )
-        message = (
-            message_match.group(1).strip()
-            if message_match
-            else "This time slot is already used."
-        ).strip()
-        options_match = re.search(
-            r"<resolution_options>\s*([\s\S]*?)\s*</resolution_options>",
-            text,
-            re.DOTALL | re.IGNORECASE,
-        )
-        options_raw = (
-            options_match.group(1).strip() if options_match else "[]"
-        ).strip()
-        json_match = re.search(r"```(?:json)?\s*([\s\S]*?)```", options_raw)
-        if json_match:
-            options_raw = json_match.group(1).strip()
+        message = tags.get("message", "This time slot is already used.")
+        options_raw = _strip_json_fence(tags.get("resolution_options", "[]"))
         try:
-            options_data = json.loads(options_raw)
-        except json.JSONDecodeError:
+            options_data = orjson.loads(options_raw)
+        except orjson.JSONDecodeError:
             options_data = []
         if not isinstance(options_data, list):
             options_data = []
@@ -1372,7 +2116,7 @@ def _parse_add_to_plan_resolve_response(
                 and isinstance(opt["itinerary"], list)
                 and len(opt["itinerary"]) > 0
             ):
-                parsed = _parse_itinerary_json(json.dumps(opt["itinerary"]))
+                parsed = _normalize_itinerary(opt["itinerary"])
                 if parsed:
                     item["itinerary"] = parsed
             resolution_options.append(item)
@@ -1387,14 +2131,8 @@ def _parse_add_to_plan_resolve_response(
             "resolutionOptions": resolution_options,
         }
     # resolution add or missing: try to extract itinerary
-    itinerary_match = re.search(
-        r"<itinerary>\s*([\s\S]*?)\s*</itinerary>", text, re.DOTALL | re.IGNORECASE
-    )
-    if itinerary_match:
-        raw = itinerary_match.group(1).strip()
-        json_match = re.search(r"```(?:json)?\s*([\s\S]*?)```", raw)
-        raw = json_match.group(1).strip() if json_match else raw
-        parsed = _parse_itinerary_json(raw)
+    if "itinerary" in tags:
+        parsed = _parse_itinerary_json(_strip_json_fence(tags["itinerary"]))
         if parsed:
             return {"action": "add", "itinerary": parsed}
     return {
@@ -1403,69 +2141,204 @@ def _parse_add_to_plan_resolve_response(
     }
 
 
+# Typing status shown to the chat while a tool runs
+_TOOL_STATUS = {
+    "search_places": "Searching for places...",
+    "search_food_places": "Searching for places...",
+    "search_food_places_batch": "Searching for places...",
+    "get_place_details": "Checking opening hours...",
+    "get_distance_matrix": "Getting travel times...",
+    "get_directions": "Getting route...",
+    "search_flights": "Searching for flights...",
+    "search_hotels": "Searching for hotels...",
+}
+
+# Status shown to the chat while the model is still writing, keyed by the tag it just opened
+_STREAM_TAG_STATUS = {
+    "<response>": "Writing your response...",
+    "<itinerary>": "Writing your itinerary...",
+    "<suggestions>": "Adding suggestions...",
+}
+
+# Minimum seconds between message_delta frames while a reply streams in
+_DELTA_INTERVAL_SECONDS = 0.05
+
+
+@dataclass
+class _ResponseTap:
+    """Follows streamed model output and forwards the text inside <response>...</response> as it
+    grows, batched to one on_delta call per _DELTA_INTERVAL_SECONDS. on_delta(text, replace):
+    replace=True means drop the text sent so far (a tool round's draft was superseded)."""
+
+    on_delta: Callable[[str, bool], None]
+    # Before <response>: last few chars, in case the tag spans chunks. After: unsent body text
+    carry: str = ""
+    found: bool = False
+    done: bool = False
+    sent_any: bool = False
+    last: float = 0.0
+
+    def feed(self, piece: str) -> None:
+        if self.done:
+            return
+        buf = self.carry + piece
+        if not self.found:
+            i = buf.translate(_ASCII_LOWER).find("<response>")
+            if i < 0:
+                self.carry = buf[-(len("<response>") - 1) :]
+                return
+            self.found = True
+            buf = buf[i + len("<response>") :]
+        # buf only holds text not yet forwarded, so each chunk is scanned a bounded number of times
+        end = buf.translate(_ASCII_LOWER).find("</response>")
+        held = ""
+        if end >= 0:
+            buf = buf[:end]
+            self.done = True
+        else:
+            # Hold back a trailing fragment that may be the start of the closing tag
+            lt = buf.rfind("<", max(0, len(buf) - len("</response>")))
+            if lt >= 0 and "</response>".startswith(buf[lt:].translate(_ASCII_LOWER)):
+                buf, held = buf[:lt], buf[lt:]
+        now = time.monotonic()
+        if buf and (self.done or now - self.last >= _DELTA_INTERVAL_SECONDS):
+            self.on_delta(buf, False)
+            self.sent_any = True
+            self.last = now
+            self.carry = held
+        else:
+            self.carry = buf + held
+
+    def flush(self) -> None:
+        """Send throttled text still held back when the stream ends without </response>."""
+        if self.found and not self.done and self.carry:
+            self.on_delta(self.carry, False)
+            self.sent_any = True
+            self.carry = ""
+        self.done = True
+
+    def reset(self) -> None:
+        """Start over for the next tool round, clearing any draft already sent."""
+        if self.sent_any:
+            self.on_delta("", True)
+        self.carry = ""
+        self.found = self.done = self.sent_any = False
+
+
+def _read_completion_stream(
+    stream: Any,
+    on_status: Callable[[str], None] | None = None,
+    tap: _ResponseTap | None = None,
+) -> tuple[str, list[SimpleNamespace]]:
+    """Drain a streamed chat completion into (content, tool_calls). Tool-call deltas are merged
+    by index into objects shaped like the non-streamed ones (tc.id, tc.function.name/.arguments).
+    Pushes a status update the first time each tag in _STREAM_TAG_STATUS appears, and the
+    <response> text to tap as it arrives."""
+    parts: list[str] = []
+    calls: dict[int, SimpleNamespace] = {}
+    tail = ""
+    announced: set[str] = set()
+    try:
+        for chunk in stream:
+            if not chunk.choices:
+                continue
+            delta = chunk.choices[0].delta
+            if delta.content:
+                parts.append(delta.content)
+                if tap is not None:
+                    tap.feed(delta.content)
+                if on_status is not None:
+                    tail = (tail + delta.content)[-32:].lower()
+                    for tag, status in _STREAM_TAG_STATUS.items():
+                        if tag not in announced and tag in tail:
+                            announced.add(tag)
+                            on_status(status)
+            for tc in delta.tool_calls or []:
+                call = calls.get(tc.index)
+                if call is None:
+                    call = calls[tc.index] = SimpleNamespace(
+                        id="", function=SimpleNamespace(name="", arguments="")
+                    )
+                if tc.id:
+                    call.id = tc.id
+                if tc.function is not None:
+                    if tc.function.name and not call.function.name:
+                        call.function.name = tc.function.name
+                    if tc.function.arguments:
+                        call.function.arguments += tc.function.arguments
+        if tap is not None:
+            tap.flush()
+    finally:
+        stream.close()
+    return "".join(parts), [calls[i] for i in sorted(calls)]
+
+
 def _call_openrouter_sync(
     messages: list[dict],
     extra_user_message: str | None = None,
     existing_itinerary: list[dict] | None = None,
     trip_info: dict[str, Any] | None = None,
-    status_queue: queue.Queue[str] | None = None,
+    on_status: Callable[[str], None] | None = None,
+    response_format: dict[str, Any] | None = None,
+    on_delta: Callable[[str, bool], None] | None = None,
 ) -> str:
     """Call OpenRouter API (google/gemini-3-flash-preview) via OpenAI-compatible chat completions. Returns response text."""
     if not OPENROUTER_API_KEY:
         logger.warning("OpenRouter: no API key set")
         return "The AI assistant is not configured. Set OPENROUTER_API_KEY or EXPO_PUBLIC_OPENROUTER_API_KEY in .env.local."
     try:
-        from openai import OpenAI
-
-        client = OpenAI(
-            base_url="https://openrouter.ai/api/v1",
-            api_key=OPENROUTER_API_KEY,
-        )
-        # Build context: trip name/destination first, then itinerary
-        trip_prefix = ""
+        client = _openrouter_client()
+        # Static-first for prompt caching: system instruction, then the trip/itinerary context
+        # (unchanged between turns until the plan changes) as its own cache breakpoint, then chat
+        context_parts: list[str] = []
         if trip_info:
-            name = trip_info.get("name") or "Trip"
-            destination = trip_info.get("destination") or "TBD"
-            trip_prefix = TRIP_INFO_PREFIX.format(name=name, destination=destination)
-        # Prepend itinerary context (existing plan or "none") to first user message
+            context_parts.append(
+                TRIP_INFO_PREFIX.format(
+                    name=trip_info.get("name") or "Trip",
+                    destination=trip_info.get("destination") or "TBD",
+                )
+            )
         if existing_itinerary:
-            itinerary_context = (
-                trip_prefix
-                + ITINERARY_CONTEXT_PREFIX
-                + json.dumps(existing_itinerary, indent=2)
-                + ITINERARY_CONTEXT_SUFFIX
+            context_parts += (
+                ITINERARY_CONTEXT_PREFIX,
+                orjson.dumps(existing_itinerary).decode(),
+                ITINERARY_CONTEXT_SUFFIX,
             )
         else:
-            itinerary_context = (
-                trip_prefix
-                + "=== CONTEXT ===\nThere is no itinerary in the Plan tab yet. If the user asks what the plan is, say they don't have one yet and offer to help create one.\n\n--- Conversation: ---\n\n"
-            )
-        # Build OpenAI-format messages with system instruction
-        api_messages: list[dict] = [{"role": "system", "content": SYSTEM_INSTRUCTION}]
-        for i, m in enumerate(messages):
-            role = m.get("role", "user")
+            context_parts.append(NO_ITINERARY_CONTEXT)
+        api_messages: list[dict] = [
+            _SYSTEM_MESSAGE,
+            {
+                "role": "system",
+                "content": [
+                    {
+                        "type": "text",
+                        "text": "".join(context_parts),
+                        "cache_control": {"type": "ephemeral"},
+                    }
+                ],
+            },
+        ]
+        prefix_len = len(api_messages)
+        for m in messages:
             content = m.get("content", "")
-            if not content:
-                continue
-            if i == 0 and role == "user" and itinerary_context:
-                content = itinerary_context + content
-            api_messages.append({"role": role, "content": content})
-        if len(api_messages) <= 1:
+            if content:
+                api_messages.append({"role": m.get("role", "user"), "content": content})
+        if len(api_messages) == prefix_len:
             return "No chat history to send. Say something and mention @gemini again."
         if extra_user_message:
             api_messages.append({"role": "user", "content": extra_user_message})
         max_tool_rounds = 25
         out = ""
+        # One tap for the whole call; reset after a tool round so its draft is not appended to
+        tap = _ResponseTap(on_delta) if on_delta is not None else None
         for _round in range(max_tool_rounds):
-            if status_queue is not None:
-                try:
-                    status_queue.put_nowait(
-                        "Planning your itinerary..."
-                        if _round == 0
-                        else "Writing your response..."
-                    )
-                except queue.Full:
-                    pass
+            if on_status is not None:
+                on_status(
+                    "Planning your itinerary..."
+                    if _round == 0
+                    else "Writing your response..."
+                )
             logger.info(
                 "OpenRouter: calling model=%s with %d messages (round %d)",
                 OPENROUTER_MODEL,
@@ -1478,23 +2351,26 @@ def _call_openrouter_sync(
                 "max_tokens": 2048,
                 "temperature": 0.7,
             }
-            kwargs["tools"] = PLACES_TOOLS
-            kwargs["tool_choice"] = "auto"
-            response = client.chat.completions.create(**kwargs)
-            if not response or not response.choices:
-                break
-            msg = response.choices[0].message
-            if not msg:
-                break
-            if msg.content:
-                out = (msg.content or "").strip()
-            tool_calls = getattr(msg, "tool_calls", None) or []
+            kwargs["stream"] = True
+            if response_format is not None:
+                # Schema output only: Gemini routes reject tools combined with a JSON response type
+                kwargs["response_format"] = response_format
+            else:
+                kwargs["tools"] = PLACES_TOOLS
+                kwargs["tool_choice"] = "auto"
+            content, tool_calls = _read_completion_stream(
+                client.chat.completions.create(**kwargs), on_status, tap
+            )
+            if content:
+                out = content.strip()
             if not tool_calls:
                 break
+            if tap is not None:
+                tap.reset()
             # Append assistant message with tool_calls
             assistant_msg: dict[str, Any] = {
                 "role": "assistant",
-                "content": msg.content or None,
+                "content": content or None,
             }
             if tool_calls:
                 assistant_msg["tool_calls"] = [
@@ -1509,38 +2385,46 @@ def _call_openrouter_sync(
                     for tc in tool_calls
                 ]
             api_messages.append(assistant_msg)
-            # Execute each tool and append tool results; push status for UI
+            # Push status for UI, then execute the round's tools concurrently and
+            # append tool results in call order
+            tool_args: list[dict[str, Any]] = []
             for tc in tool_calls:
-                if status_queue is not None:
-                    try:
-                        if (
-                            tc.function.name == "search_places"
-                            or tc.function.name == "search_food_places"
-                        ):
-                            status_queue.put_nowait("Searching for places...")
-                        elif tc.function.name == "get_place_details":
-                            status_queue.put_nowait("Checking opening hours...")
-                        elif tc.function.name == "get_distance_matrix":
-                            status_queue.put_nowait("Getting travel times...")
-                        elif tc.function.name == "get_directions":
-                            status_queue.put_nowait("Getting route...")
-                        elif tc.function.name == "search_flights":
-                            status_queue.put_nowait("Searching for flights...")
-                        elif tc.function.name == "search_hotels":
-                            status_queue.put_nowait("Searching for hotels...")
-                        else:
-                            status_queue.put_nowait("Fetching info...")
-                    except queue.Full:
-                        pass
+                if on_status is not None:
+                    on_status(_TOOL_STATUS.get(tc.function.name, "Fetching info..."))
                 try:
                     args = (
-                        json.loads(tc.function.arguments)
+                        orjson.loads(tc.function.arguments)
                         if isinstance(tc.function.arguments, str)
                         else (tc.function.arguments or {})
                     )
-                except json.JSONDecodeError:
+                except orjson.JSONDecodeError:
                     args = {}
-                result = _execute_tool(tc.function.name, args)
+                tool_args.append(args)
+            # Identical calls in one round (e.g. get_place_details for a place found by two
+            # searches) run once and share the result
+            unique: dict[tuple[str, bytes], tuple[str, dict[str, Any]]] = {}
+            call_keys: list[tuple[str, bytes]] = []
+            for tc, args in zip(tool_calls, tool_args):
+                key = (
+                    tc.function.name,
+                    orjson.dumps(args, default=str, option=orjson.OPT_SORT_KEYS),
+                )
+                unique.setdefault(key, (tc.function.name, args))
+                call_keys.append(key)
+            if len(unique) == 1:
+                ((name, args),) = unique.values()
+                unique_results = [_execute_tool(name, args)]
+            else:
+                unique_results = list(
+                    _TOOL_POOL.map(
+                        _execute_tool,
+                        [name for name, _ in unique.values()],
+                        [args for _, args in unique.values()],
+                    )
+                )
+            by_key = dict(zip(unique, unique_results))
+            results = [by_key[key] for key in call_keys]
+            for tc, result in zip(tool_calls, results):
                 api_messages.append(
                     {"role": "tool", "tool_call_id": tc.id, "content": result}
                 )
@@ -1548,27 +2432,32 @@ def _call_openrouter_sync(
             logger.info("OpenRouter: got response length=%d", len(out))
             return out
         logger.warning("OpenRouter: empty or no content on response")
-        return "I couldn't generate a response. Please try again."
+        return EMPTY_RESPONSE_MESSAGE
     except Exception as e:
         logger.exception("OpenRouter API error: %s", e)
         return f"Something went wrong while calling the AI: {str(e)}"
 
 
+def _opt_str(value: Any) -> str | None:
+    """Optional text field from model/client JSON: stripped str, or None if missing/null/blank."""
+    if value is None:
+        return None
+    return (value if isinstance(value, str) else str(value)).strip() or None
+
+
 def _parse_suggestions(text: str) -> list[dict] | None:
     """Extract <suggestions> JSON array from AI response for add-to-plan options."""
     if not text:
         return None
-    match = re.search(
-        r"<suggestions>\s*([\s\S]*?)\s*</suggestions>", text, re.DOTALL | re.IGNORECASE
-    )
-    if not match:
-        return None
-    raw = match.group(1).strip()
-    json_match = re.search(r"```(?:json)?\s*([\s\S]*?)```", raw)
-    if json_match:
-        raw = json_match.group(1).strip()
+    block = _extract_tags(text, ("suggestions",)).get("suggestions")
+    return _parse_suggestions_block(block) if block is not None else None
+
+
+def _parse_suggestions_block(block: str) -> list[dict] | None:
+    """Parse the inner text of a <suggestions> tag (JSON array, optionally fenced)."""
+    raw = _strip_json_fence(block)
     try:
-        data = json.loads(raw)
+        data = orjson.loads(raw)
         if not isinstance(data, list) or len(data) == 0:
             return None
         out = []
@@ -1581,17 +2470,16 @@ def _parse_suggestions(text: str) -> list[dict] | None:
             out.append(
                 {
                     "title": str(title),
-                    "description": str(item.get("description", "")).strip() or None,
-                    "location": str(item.get("location", "")).strip() or None,
-                    "dayLabel": str(item.get("dayLabel", "")).strip() or None,
-                    "time": str(item.get("time", "")).strip() or None,
-                    "replaceActivityId": str(item.get("replaceActivityId", "")).strip()
-                    or None,
-                    "replaceTitle": str(item.get("replaceTitle", "")).strip() or None,
+                    "description": _opt_str(item.get("description")),
+                    "location": _opt_str(item.get("location")),
+                    "dayLabel": _opt_str(item.get("dayLabel")),
+                    "time": _opt_str(item.get("time")),
+                    "replaceActivityId": _opt_str(item.get("replaceActivityId")),
+                    "replaceTitle": _opt_str(item.get("replaceTitle")),
                 }
             )
         return out if out else None
-    except (json.JSONDecodeError, TypeError):
+    except (orjson.JSONDecodeError, TypeError):
         return None
 
 
@@ -1599,13 +2487,7 @@ def _parse_destination(text: str) -> str | None:
     """Extract <destination>...</destination> from AI response. Returns stripped value or None."""
     if not text or not text.strip():
         return None
-    match = re.search(
-        r"<destination>\s*([\s\S]*?)\s*</destination>", text, re.DOTALL | re.IGNORECASE
-    )
-    if not match:
-        return None
-    value = (match.group(1) or "").strip()
-    return value if value else None
+    return _extract_tags(text, ("destination",)).get("destination") or None
 
 
 def _parse_structured_response(
@@ -1620,26 +2502,18 @@ def _parse_structured_response(
     if not text:
         return ("", None, None, None)
     text = text.strip()
-    action_match = re.search(
-        r"<action>\s*(.+?)\s*</action>", text, re.DOTALL | re.IGNORECASE
+    # One scan for every tag instead of a regex pass per tag
+    tags = _extract_tags(
+        text, ("action", "response", "itinerary", "destination", "suggestions")
     )
-    response_match = re.search(
-        r"<response>\s*([\s\S]*?)\s*</response>", text, re.DOTALL | re.IGNORECASE
+    destination = tags.get("destination") or None
+    action = tags.get("action", "").lower().replace(" ", "_")
+    response_text = tags.get("response", text)
+    suggestions = (
+        _parse_suggestions_block(tags["suggestions"]) if "suggestions" in tags else None
     )
-    itinerary_match = re.search(
-        r"<itinerary>\s*([\s\S]*?)\s*</itinerary>", text, re.DOTALL | re.IGNORECASE
-    )
-    destination = _parse_destination(text)
-    action = (action_match.group(1).strip().lower() if action_match else "").replace(
-        " ", "_"
-    )
-    response_text = response_match.group(1).strip() if response_match else text
-    suggestions = _parse_suggestions(text)
-    if action == "update_itinerary" and itinerary_match:
-        itinerary_block = itinerary_match.group(1).strip()
-        json_match = re.search(r"```(?:json)?\s*([\s\S]*?)```", itinerary_block)
-        raw_json = json_match.group(1).strip() if json_match else itinerary_block
-        parsed = _parse_itinerary_json(raw_json)
+    if action == "update_itinerary" and "itinerary" in tags:
+        parsed = _parse_itinerary_json(_strip_json_fence(tags["itinerary"]))
         return (response_text, parsed, suggestions, destination)
     if action == "respond" or action == "respond_only":
         return (response_text, None, suggestions, destination)
@@ -1652,13 +2526,71 @@ def _extract_itinerary_from_response(text: str) -> list[dict] | None:
     """Extract itinerary JSON from model response (e.g. ```json ... ```)."""
     if not text:
         return None
-    # Match ```json ... ``` or ``` ... ``` block (greedy to get full block)
-    match = re.search(r"```(?:json)?\s*([\s\S]*?)```", text)
-    if match:
-        raw = match.group(1).strip()
+    # Use the ```json ... ``` or ``` ... ``` block if there is one
+    return _parse_itinerary_json(_strip_json_fence(text.strip()))
+
+
+def _repair_itinerary_json(text: str) -> list[dict] | None:
+    """Recover itinerary JSON the model wrapped badly: unclosed <itinerary> tag, prose around the
+    array, trailing commas. Truncated JSON is not patched up (that would drop days); returns None."""
+    lowered = text.translate(_ASCII_LOWER)
+    tag = lowered.find("<itinerary>")
+    if tag != -1:
+        # Only the tag body: fences elsewhere hold suggestions or examples, not the plan
+        offset = tag + len("<itinerary>")
+        end = lowered.find("</itinerary>", offset)
+        region = text[offset:] if end == -1 else text[offset:end]
+    elif "update_itinerary" in _extract_tags(text, ("action",)).get("action", "").lower():
+        fence = text.find("```")
+        if fence == -1:
+            return None
+        region = text[fence + 3 :]
+    else:
+        return None
+    start = next((i for i, ch in enumerate(region) if ch in "[{"), -1)
+    if start == -1:
+        return None
+    out: list[str] = []
+    closers: list[str] = []
+    in_str = escaped = False
+    for ch in region[start:]:
+        out.append(ch)
+        if in_str:
+            if escaped:
+                escaped = False
+            elif ch == "\\":
+                escaped = True
+            elif ch == '"':
+                in_str = False
+        elif ch == '"':
+            in_str = True
+        elif ch in "[{":
+            closers.append("]" if ch == "[" else "}")
+        elif ch in "]}":
+            if not closers or closers.pop() != ch:
+                return None
+            # Drop a trailing comma before the closer
+            i = len(out) - 2
+            while i >= 0 and out[i].isspace():
+                i -= 1
+            if i >= 0 and out[i] == ",":
+                del out[i]
+            if not closers:
+                break
     else:
-        raw = text.strip()
-    return _parse_itinerary_json(raw)
+        return None
+    try:
+        data = orjson.loads("".join(out))
+    except orjson.JSONDecodeError:
+        return None
+    if isinstance(data, dict):
+        data = data.get("itinerary")
+    # Every item must already look like a day, or e.g. a suggestions array would pass as one
+    if not isinstance(data, list) or not all(
+        isinstance(day, dict) and isinstance(day.get("activities"), list) for day in data
+    ):
+        return None
+    return _normalize_itinerary(data)
 
 
 def _parse_time_to_minutes(time_str: str) -> int:
@@ -1666,37 +2598,50 @@ def _parse_time_to_minutes(time_str: str) -> int:
     Returns 9999 for unparseable so activities without times sort to the end."""
     if not time_str or not isinstance(time_str, str):
         return 9999
+    return _time_str_minutes(time_str)
+
+
+@functools.lru_cache(maxsize=1024)
+def _time_str_minutes(time_str: str) -> int:
+    """Memoized body of _parse_time_to_minutes. Hand-rolled scan (no regex) of "H[H]:MM[ ][AM|PM]"
+    or "H[H][ ]AM|PM"; anything after the match is ignored, as with a prefix match."""
     s = time_str.strip().upper()
-    if not s:
+    n = 0
+    while n < len(s) and s[n].isdecimal():
+        n += 1
+    if n == 0 or n > 2:
         return 9999
-    # Match "9:00 AM", "9:00AM", "12:30 PM"
-    m = re.match(r"(\d{1,2}):(\d{2})\s*(AM|PM)?", s, re.IGNORECASE)
-    if m:
-        h, mn, ampm = int(m.group(1)), int(m.group(2)), (m.group(3) or "").upper()
-        if ampm == "PM" and h != 12:
+    h = int(s[:n])
+    rest = s[n:]
+    if rest[:1] == ":":
+        # "9:00 AM", "9:00AM", "12:30 PM", "14:30" (no suffix = 24h)
+        mm = rest[1:3]
+        if len(mm) != 2 or not mm.isdecimal():
+            return 9999
+        suffix = rest[3:].lstrip()[:2]
+        if suffix == "PM" and h != 12:
             h += 12
-        elif ampm == "AM" and h == 12:
+        elif suffix == "AM" and h == 12:
             h = 0
-        elif not ampm and h < 24:
-            pass  # 24h format
-        elif not ampm and h >= 12:
-            pass  # ambiguous, assume 24h
-        return h * 60 + min(mn, 59)
-    # Match "9 AM", "6 PM"
-    m = re.match(r"(\d{1,2})\s*(AM|PM)", s, re.IGNORECASE)
-    if m:
-        h, ampm = int(m.group(1)), (m.group(2) or "").upper()
-        if ampm == "PM" and h != 12:
-            h += 12
-        elif ampm == "AM" and h == 12:
-            h = 0
-        return h * 60
-    return 9999
+        return h * 60 + min(int(mm), 59)
+    # "9 AM", "6 PM"
+    suffix = rest.lstrip()[:2]
+    if suffix not in ("AM", "PM"):
+        return 9999
+    if suffix == "PM" and h != 12:
+        h += 12
+    elif suffix == "AM" and h == 12:
+        h = 0
+    return h * 60
 
 
-def _sort_activities_chronologically(activities: list[dict]) -> list[dict]:
-    """Sort activities by time of day. Activities without time go at the end."""
-    return sorted(activities, key=lambda a: _parse_time_to_minutes(a.get("time") or ""))
+def _activity_minutes(activity: dict) -> int:
+    return _parse_time_to_minutes(activity.get("time") or "")
+
+
+def _insert_chronologically(activities: list[dict], activity: dict) -> None:
+    """Insert into an already-sorted day in place (after any activities at the same time)."""
+    bisect.insort(activities, activity, key=_activity_minutes)
 
 
 # --- Expenses and Bill Splitting ---
@@ -1798,16 +2743,10 @@ async def upload_receipt_and_ocr(
     unique_filename = f"{uuid.uuid4()}{file_ext}"
     file_path = RECEIPTS_DIR / unique_filename
 
-    # Save file
+    # Save file (off the event loop) and base64-encode the in-memory bytes for OpenRouter
     content = await file.read()
-    with open(file_path, "wb") as f:
-        f.write(content)
-
-    # Convert image to base64 for OpenRouter
-    import base64
-
-    with open(file_path, "rb") as img_file:
-        img_data = base64.b64encode(img_file.read()).decode("utf-8")
+    await asyncio.to_thread(file_path.write_bytes, content)
+    img_data = base64.b64encode(content).decode("ascii")
 
     # Determine mime type
     mime_type = file.content_type or "image/jpeg"
@@ -1816,12 +2755,7 @@ async def upload_receipt_and_ocr(
 
     # Call OpenRouter with Gemini 2.0 Flash for OCR
     try:
-        from openai import OpenAI
-
-        client = OpenAI(
-            base_url="https://openrouter.ai/api/v1",
-            api_key=OPENROUTER_API_KEY,
-        )
+        client = _openrouter_client()
 
         response = client.chat.completions.create(
             model="google/gemini-2.0-flash-001",
@@ -1858,13 +2792,11 @@ Return ONLY valid JSON, no other text.""",
         result_text = response.choices[0].message.content or ""
 
         # Try to parse JSON from response
-        json_match = re.search(r"```(?:json)?\s*([\s\S]*?)```", result_text)
-        if json_match:
-            result_text = json_match.group(1).strip()
+        result_text = _strip_json_fence(result_text)
 
         try:
-            parsed_data = json.loads(result_text)
-        except json.JSONDecodeError:
+            parsed_data = orjson.loads(result_text)
+        except orjson.JSONDecodeError:
             parsed_data = {
                 "merchant": "Unknown",
                 "total": 0.0,
@@ -1902,43 +2834,99 @@ def api_get_trip_receipts(trip_id: str) -> list[dict[str, Any]]:
     return receipts
 
 
-def _parse_itinerary_json(raw: str) -> list[dict] | None:
-    """Parse and normalize itinerary JSON string to our schema.
+def _normalize_itinerary(items: Any) -> list[dict] | None:
+    """Normalize an already-parsed itinerary (list of day dicts) to our schema.
     Activities within each day are sorted chronologically by time."""
-    if not raw:
+    if not isinstance(items, list) or len(items) == 0:
         return None
     try:
-        data = json.loads(raw)
-        if not isinstance(data, list) or len(data) == 0:
-            return None
         out = []
-        for i, day in enumerate(data):
+        for i, day in enumerate(items):
             if not isinstance(day, dict):
                 continue
             activities = [
                 {
                     "id": a.get("id") or f"act-{j + 1}",
-                    "time": str(a.get("time", "")).strip() or None,
+                    "time": _opt_str(a.get("time")),
                     "title": str(a.get("title") or ""),
-                    "description": str(a.get("description", "")).strip() or None,
-                    "location": str(a.get("location", "")).strip() or None,
+                    "description": _opt_str(a.get("description")),
+                    "location": _opt_str(a.get("location")),
                 }
                 for j, a in enumerate(day.get("activities") or [])
                 if isinstance(a, dict)
             ]
-            activities = _sort_activities_chronologically(activities)
+            # Sort the freshly built list in place rather than allocating a sorted copy
+            activities.sort(key=_activity_minutes)
             out.append(
                 {
                     "id": day.get("id") or f"day-{i + 1}",
                     "dayNumber": int(day.get("dayNumber", i + 1)),
                     "title": str(day.get("title") or f"Day {i + 1}"),
-                    "date": str(day.get("date", "")).strip() or None,
+                    "date": _opt_str(day.get("date")),
                     "activities": activities,
                 }
             )
         return out if out else None
-    except (json.JSONDecodeError, TypeError):
+    except TypeError:
+        return None
+
+
+@functools.lru_cache(maxsize=256)
+def _normalized_itinerary_bytes(raw: str | bytes) -> bytes | None:
+    """Parse + normalize itinerary JSON text, memoized by input. Cached as orjson bytes (immutable)
+    so repeated model outputs (e.g. retries) skip normalization and callers never share lists."""
+    try:
+        data = orjson.loads(raw)
+    except orjson.JSONDecodeError:
+        return None
+    if isinstance(data, dict):
+        # Object-wrapped form returned under ITINERARY_RESPONSE_FORMAT
+        data = data.get("itinerary")
+    normalized = _normalize_itinerary(data)
+    return orjson.dumps(normalized) if normalized else None
+
+
+def _parse_itinerary_json(raw: str | bytes) -> list[dict] | None:
+    """Parse itinerary JSON text (e.g. from LLM output) and normalize it to our schema."""
+    if not raw:
         return None
+    frozen = _normalized_itinerary_bytes(raw)
+    return orjson.loads(frozen) if frozen else None
+
+
+# Case-insensitive @gemini check without lowercasing a copy of every chat message
+_GEMINI_MENTION_RE = re.compile("@gemini", re.IGNORECASE | re.ASCII)
+
+
+def _load_ai_context(
+    trip_id: str,
+) -> tuple[list[dict], dict[str, Any] | None, str | None]:
+    """Recent chat history, trip row and stored itinerary JSON for an @gemini turn (one thread hop)."""
+    return (
+        get_recent_messages(trip_id, CHAT_HISTORY_MAX_MESSAGES),
+        db_get_trip(trip_id),
+        get_itinerary(trip_id),
+    )
+
+
+def _save_ai_turn(
+    trip_id: str,
+    chat_message: str,
+    itinerary_json: str | None,
+    destination: str | None,
+) -> dict[str, Any]:
+    """Persist an AI turn's destination, itinerary and reply (one thread hop). Returns the saved message."""
+    if destination:
+        update_trip_destination(trip_id, destination)
+    if itinerary_json:
+        set_itinerary(trip_id, itinerary_json)
+    return add_message(
+        trip_id=trip_id,
+        content=chat_message,
+        is_ai=True,
+        user_id=None,
+        user_name="Gemini",
+    )
 
 
 @app.websocket("/ws/{trip_id}")
@@ -1949,34 +2937,34 @@ async def websocket_chat(
     user_name: str = Query("You"),
 ) -> None:
     await websocket.accept()
-    room = get_room(trip_id)
-    room.add(websocket)
-    logger.info("Client joined trip_id=%s (connections=%d)", trip_id, len(room))
+    conn_id = rooms.connect(trip_id, websocket)
+    logger.info(
+        "Client joined trip_id=%s (connections=%d)", trip_id, rooms.count(trip_id)
+    )
 
     try:
-        # Send existing messages and itinerary so new joiners get full state
+        # Send existing messages and itinerary so new joiners get full state. Read inline (not in
+        # a thread) so the history frame is the first one queued for this socket. A message saved
+        # but not yet published can still arrive again after it; the client dedupes by id.
         history = get_messages(trip_id)
         itinerary_raw = get_itinerary(trip_id)
-        itinerary_list = None
-        if itinerary_raw:
-            try:
-                itinerary_list = json.loads(itinerary_raw)
-            except json.JSONDecodeError:
-                pass
-        await websocket.send_json(
+        itinerary = _itinerary_fragment(itinerary_raw) if itinerary_raw else None
+        rooms.send_to(
+            trip_id,
+            conn_id,
             {
                 "type": "history",
                 "messages": history,
-                **({"itinerary": itinerary_list} if itinerary_list else {}),
-            }
+                **({"itinerary": itinerary} if itinerary is not None else {}),
+            },
         )
 
         while True:
             data = await websocket.receive_text()
             try:
-                msg = json.loads(data)
-            except json.JSONDecodeError:
-                await websocket.send_json({"type": "error", "message": "Invalid JSON"})
+                msg = orjson.loads(data)
+            except orjson.JSONDecodeError:
+                rooms.send_to(trip_id, conn_id, {"type": "error", "message": "Invalid JSON"})
                 continue
 
             # Handle typing indicator events
@@ -1988,12 +2976,7 @@ async def websocket_chat(
                     "user_id": msg.get("user_id", ""),
                     "user_name": msg.get("user_name", "Unknown"),
                 }
-                for ws in room:
-                    if ws != websocket:  # Don't send back to sender
-                        try:
-                            await ws.send_json(typing_payload)
-                        except Exception:
-                            pass
+                await publish(trip_id, typing_payload, exclude=conn_id)
                 continue
             elif msg_type == "stop_typing":
                 # Could broadcast stop_typing, but we handle timeout on frontend
@@ -2004,7 +2987,8 @@ async def websocket_chat(
                 continue
 
             is_ai = bool(msg.get("is_ai", False))
-            saved = add_message(
+            saved = await asyncio.to_thread(
+                add_message,
                 trip_id=trip_id,
                 content=content,
                 is_ai=is_ai,
@@ -2013,44 +2997,36 @@ async def websocket_chat(
             )
 
             # Broadcast to everyone in the room (including sender)
-            payload = {"type": "message", "message": saved}
-            dead = set()
-            for ws in room:
-                try:
-                    await ws.send_json(payload)
-                except Exception:
-                    dead.add(ws)
-            for ws in dead:
-                room.discard(ws)
+            await publish(trip_id, {"type": "message", "message": saved})
 
             # If user mentioned @gemini, show typing, call Gemini, then add to Plan tab and notify
-            if "@gemini" in content.lower():
+            if _GEMINI_MENTION_RE.search(content):
                 logger.info(
                     "OpenRouter: @gemini mention detected for trip_id=%s", trip_id
                 )
                 # Broadcast typing indicator so clients show "Gemini is typing..."
-                for ws in room:
-                    try:
-                        await ws.send_json({"type": "typing", "user_name": "Gemini"})
-                    except Exception:
-                        pass
-                history_after = get_messages(trip_id)
-                messages = _build_chat_messages(history_after)
+                await publish(trip_id, {"type": "typing", "user_name": "Gemini"})
+                # Recent history, trip info and existing itinerary for LLM context
+                history_after, trip_info, itinerary_raw = await asyncio.to_thread(
+                    _load_ai_context, trip_id
+                )
+                messages = _build_chat_messages(history_after, trip_id)
                 if not messages:
                     logger.warning("OpenRouter: no messages built from history")
                     continue
-                # Fetch trip info and existing itinerary for LLM context
-                trip_info = db_get_trip(trip_id)
-                itinerary_raw = get_itinerary(trip_id)
                 existing_itinerary = None
                 if itinerary_raw:
                     try:
-                        existing_itinerary = json.loads(itinerary_raw)
-                    except json.JSONDecodeError:
+                        existing_itinerary = orjson.loads(itinerary_raw)
+                    except orjson.JSONDecodeError:
                         pass
-                status_queue: queue.Queue[str] = queue.Queue()
+                status_queue: asyncio.Queue[dict[str, Any] | None] = asyncio.Queue()
                 drain_task = asyncio.create_task(
-                    _drain_status_queue(status_queue, room)
+                    _drain_status_queue(status_queue, trip_id)
+                )
+                push = functools.partial(
+                    asyncio.get_running_loop().call_soon_threadsafe,
+                    status_queue.put_nowait,
                 )
                 try:
                     ai_text = await asyncio.to_thread(
@@ -2059,26 +3035,36 @@ async def websocket_chat(
                         None,
                         existing_itinerary,
                         trip_info,
-                        status_queue,
+                        on_status=lambda msg: push(
+                            {"type": "typing_status", "message": msg}
+                        ),
+                        on_delta=lambda text, replace: push(
+                            {"type": "message_delta", "text": text, "replace": True}
+                            if replace
+                            else {"type": "message_delta", "text": text}
+                        ),
                     )
                 except Exception as e:
                     logger.exception("OpenRouter: thread error %s", e)
                     ai_text = f"Something went wrong: {e}"
                 finally:
-                    drain_task.cancel()
-                    try:
-                        await drain_task
-                    except asyncio.CancelledError:
-                        pass
+                    # Scheduled through the same call_soon_threadsafe FIFO, so the end marker
+                    # lands after every payload the thread already pushed
+                    push(None)
+                    await drain_task
                 chat_message, itinerary_list, suggestions_list, destination_update = (
                     _parse_structured_response(ai_text)
                 )
                 # Retry with JSON-only prompt if update_itinerary was intended but parse failed
-                if itinerary_list is None and (
-                    "```json" in ai_text
-                    or "```" in ai_text
-                    or "<itinerary>" in ai_text.lower()
-                ):
+                wants_itinerary = itinerary_list is None and (
+                    "```" in ai_text or "<itinerary>" in ai_text.lower()
+                )
+                if wants_itinerary:
+                    # Most misses are formatting slips that can be fixed without another call
+                    itinerary_list = _repair_itinerary_json(ai_text)
+                    if itinerary_list and not chat_message:
+                        chat_message = ITINERARY_DONE_MESSAGE
+                if wants_itinerary and itinerary_list is None:
                     logger.info("OpenRouter: retrying with JSON-only prompt")
                     try:
                         retry_text = await asyncio.to_thread(
@@ -2088,6 +3074,7 @@ async def websocket_chat(
                             existing_itinerary,
                             trip_info,
                             None,
+                            ITINERARY_RESPONSE_FORMAT,
                         )
                         itinerary_list = _parse_itinerary_json(retry_text.strip())
                         if itinerary_list is None and "```" in retry_text:
@@ -2098,66 +3085,49 @@ async def websocket_chat(
                             chat_message = ITINERARY_DONE_MESSAGE
                     except Exception as retry_err:
                         logger.warning("OpenRouter: JSON retry failed: %s", retry_err)
-                if destination_update:
-                    update_trip_destination(trip_id, destination_update)
-                if itinerary_list:
-                    set_itinerary(trip_id, json.dumps(itinerary_list))
+                if not chat_message:
+                    chat_message = ai_text or EMPTY_RESPONSE_MESSAGE
+                itinerary_json = (
+                    orjson.dumps(itinerary_list).decode() if itinerary_list else None
+                )
+                ai_saved = await asyncio.to_thread(
+                    _save_ai_turn,
+                    trip_id,
+                    chat_message,
+                    itinerary_json,
+                    destination_update,
+                )
+                # Itinerary/trip_update and the AI message go out as one array frame
+                frames: list[dict[str, Any]] = []
+                if itinerary_json:
+                    # The stored JSON is spliced into the frame instead of encoding the list twice
                     payload_it = {
                         "type": "itinerary",
                         "trip_id": trip_id,
-                        "itinerary": itinerary_list,
+                        "itinerary": orjson.Fragment(itinerary_json),
                     }
                     if destination_update:
                         payload_it["destination"] = destination_update
-                    for ws in room:
-                        try:
-                            await ws.send_json(payload_it)
-                        except Exception:
-                            pass
+                    frames.append(payload_it)
                 elif destination_update:
-                    for ws in room:
-                        try:
-                            await ws.send_json(
-                                {
-                                    "type": "trip_update",
-                                    "trip_id": trip_id,
-                                    "destination": destination_update,
-                                }
-                            )
-                        except Exception:
-                            pass
-                if not chat_message:
-                    chat_message = (
-                        ai_text or "I couldn't generate a response. Please try again."
+                    frames.append(
+                        {
+                            "type": "trip_update",
+                            "trip_id": trip_id,
+                            "destination": destination_update,
+                        }
                     )
-                ai_saved = add_message(
-                    trip_id=trip_id,
-                    content=chat_message,
-                    is_ai=True,
-                    user_id=None,
-                    user_name="Gemini",
-                )
-                message_payload = dict(ai_saved)
+                # add_message returns a fresh dict, so suggestions can go straight onto it
                 if suggestions_list:
-                    message_payload["suggestions"] = suggestions_list
-                payload_ai = {"type": "message", "message": message_payload}
-                dead_ai = set()
-                for ws in room:
-                    try:
-                        await ws.send_json(payload_ai)
-                    except Exception as send_err:
-                        logger.warning(
-                            "OpenRouter: failed to send AI message to client: %s",
-                            send_err,
-                        )
-                        dead_ai.add(ws)
-                for ws in dead_ai:
-                    room.discard(ws)
+                    ai_saved["suggestions"] = suggestions_list
+                payload_ai = {"type": "message", "message": ai_saved}
+                frames.append(payload_ai)
+                await publish(trip_id, frames if len(frames) > 1 else payload_ai)
 
     except WebSocketDisconnect:
         pass
     finally:
-        room.discard(websocket)
-        if not room:
-            del rooms[trip_id]
-        logger.info("Client left trip_id=%s (connections=%d)", trip_id, len(room))
+        rooms.disconnect(trip_id, conn_id)
+        logger.info(
+            "Client left trip_id=%s (connections=%d)", trip_id, rooms.count(trip_id)
+        )
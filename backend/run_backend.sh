@@ -46,5 +46,5 @@ echo -e "${GREEN}✓ Dependencies installed${NC}"
 echo -e "${BLUE}Starting FastAPI server with hot reload on ${HOST}:${PORT}${NC}"
 echo ""
 
-# Start the server with hot reload
-uvicorn main:app --host "$HOST" --port "$PORT" --reload
+# Start the server with hot reload (uvloop and httptools come with uvicorn[standard])
+uvicorn main:app --host "$HOST" --port "$PORT" --loop uvloop --http httptools --reload